@@ -1,50 +1,23 @@
+import os
 import streamlit as st
-import main as mn
 import handlingfunctions as hd
-import joblib
-from scipy.signal import butter, filtfilt, find_peaks
-import os
-import signal
+import calculator_state
+import inference_server
+import instrumentation
+import session_replay
 # initializing text to display
 
 
-button_labels = [
-    ['', '', '', '4', '', '', ''],
-    ['', '', '5', '6', '7', '', ''],
-    ['', '1', '', '', '', '9', ''],
-    ['0', '2', '', '.', '', 'E', '8'],
-    ['', '3', '', '', '', 'C', ''],
-    ['', '', '/', '+', '-', '', ''],
-    ['', '', '', '*', '', '', '']
-]
-
-arrows = {
-    "up": "↑",
-    "down": "↓",
-    "left": "←",
-    "right": "→",
-    "blink": "✅",  # Optional: for 'blink' or selection
-    "C": "🔄"   # Optional: for reset or clear
-}
-
-def movement(m,pos):
-    r, c = pos
-    val = 2 if r == 3 and c == 3 else 1
-
-    if m == "up":
-        r -= val
-    elif m == "down":
-        r += val
-    elif m == "left":
-        c -= val
-    elif m == "right":
-        c += val
-    else:
-        r = c = 3
-    if (r >= 0 )and (r < 7) and (c >= 0) and (c < 7):
-        return (r, c)
-    else:
-        return pos
+# keypad, navigation and calculator logic are shared with main.py and session_replay.py
+button_labels = calculator_state.KEYPAD_LABELS
+arrows = calculator_state.ARROWS
+
+def calculator_session():
+    # one headless calculator (and optional session recorder) per browser session
+    if 'calc' not in st.session_state:
+        st.session_state.calc = calculator_state.Calculator()
+        st.session_state.recorder = session_replay.recorder_from_env('streamlit', per_session=True)
+    return st.session_state.calc
 
 def define_calculator():
     oper_labels = {
@@ -87,32 +60,46 @@ def define_calculator():
                 else:
                     l = label
                 class_name = "calculator_button"
-                if (i, j) == st.session_state.current_pos:
+                if (i, j) == calculator_session().position:
                     class_name += " active"
 
                 cols[j].markdown(f"<div class = '{class_name}'>{l}</div>", unsafe_allow_html=True)
             else:
                 cols[j].write(" ")
 
-def calculator(op):
-    n1,o,n2 = int(op[0]),op[1],int(op[2])
-    if o == '+':
-        return str(n1 + n2)
-    elif o =='*':
-        return str(n1 * n2)
-    elif o == '/':
-        if n2==0:
-            return str(-1)
-        else:
-            return str(n1/n2)
-    else:
-        return str(n1-n2)
+@st.cache_resource
+def load_model(model_mtime):
+    # one model instance shared by every session, reloaded when the .joblib file changes (new mtime)
+    return hd.get_model()
+
+@st.cache_resource
+def metrics():
+    # EOG_METRICS=1 turns on stage timings; sinks are configured once per server process
+    return instrumentation.configure_from_env()
+
+def latency_panel():
+    if not metrics().enabled:
+        return
+    with st.expander("⏱️ Pipeline latency"):
+        st.write(metrics().summary_line())
+        st.table({name: {k: (v * 1e3 if v is not None and k != 'count' else v) for k, v in s.items()}
+                  for name, s in metrics().snapshot()['stages'].items()})
+        if instrumentation.recent_traces is not None and instrumentation.recent_traces.records:
+            st.json(instrumentation.recent_traces.records[-1])
+
+@st.cache_resource
+def inference_client():
+    # EOG_INFERENCE_URL (http://host:port or unix:/path) sends predictions to a shared inference_server.py
+    address = os.environ.get('EOG_INFERENCE_URL')
+    return inference_server.InferenceClient(address) if address else None
+
+@st.cache_resource
+def pipeline_cache():
+    # parsed/filtered signals, features and labels keyed by the uploaded bytes, shared across sessions
+    return hd.PipelineCache(maxsize=256)
 
 def deploy():
-    if 'oper' not in st.session_state:
-        st.session_state.oper = []
-    if 'mov' not in st.session_state:
-        st.session_state.mov =[]
+    calc = calculator_session()
     col1, col2= st.columns([1,5])
 
     with col1:
@@ -136,73 +123,44 @@ def deploy():
     # Preprocessing and prediction
     if hor_file and ver_file:
         if st.button("Run Preprocessing and Predict"):
-            # reading files
-            hfile = hd.uploaded_file(hor_file)
-            vfile = hd.uploaded_file(ver_file)
-
-            h_signal = hd.validate_signal_file(hfile)
-            v_signal = hd.validate_signal_file(vfile)
-
-            # apply band bass filter on it
-            h_filtered = hd.butter_bandpass_filter(h_signal, hd.LOW_CUTOFF, hd.HIGH_CUTOFF, hd.SAMPLE_RATE, hd.ORDER)
-            v_filtered = hd.butter_bandpass_filter(v_signal, hd.LOW_CUTOFF, hd.HIGH_CUTOFF, hd.SAMPLE_RATE, hd.ORDER)
-
-            # extracting features
-            h_features = hd.extract_morphological_features(h_filtered.reshape(1, -1))
-            v_features = hd.extract_morphological_features(v_filtered.reshape(1, -1))
-
-            # apply prediction
-            selected_features = hd.features_selection(h_features, v_features)
-            label = hd.prediction(selected_features)
+            # reading, filtering, feature extraction and prediction, memoised on the uploaded content
+            with metrics().trace('streamlit_sample'):
+                if inference_client() is not None:
+                    label, _ = inference_client().predict_files(hor_file, ver_file)
+                else:
+                    result = pipeline_cache().run(hor_file, ver_file, model=load_model(hd.model_registry.mtime()))
+                    label = result['label']
+                metrics().annotate(files=[hor_file.name, ver_file.name], label=label)
 
-            if len(st.session_state.oper) == 5:
-                st.session_state.oper = []
-                st.session_state.mov = []
+            calc.apply(label)
+            if st.session_state.recorder is not None:
+                st.session_state.recorder.record(label, calc)
 
             st.success(f"Prediction result: {label}")
-            st.session_state.mov.append(arrows[label])
-
-            pre_pos =  st.session_state.current_pos
-            st.session_state.current_pos = movement(label,st.session_state.current_pos)
-            st.write("Current Position:", st.session_state.current_pos)            # making  the calculator
+            st.write("Current Position:", calc.position)            # making  the calculator
             define_calculator()
 
-            if label == 'blink' and button_labels[pre_pos[0]][pre_pos[1]] == 'C':
-                st.session_state.oper = []
-                st.session_state.mov.append(arrows['C'])
-
-            elif label == 'blink' and button_labels[pre_pos[0]][pre_pos[1]] == 'E':
+            if calc.error:
+                st.error(calc.error)
+            if calc.quit:
                 st.markdown("### 🔚 Exiting application...")
                 st.stop()
 
-            elif label == 'blink':
-                st.session_state.oper.append(button_labels[pre_pos[0]][pre_pos[1]])
-                if len(st.session_state.oper) == 3:
-                    res = calculator(st.session_state.oper)
-                    st.session_state.oper.append('=')
-                    st.session_state.oper.append(res)
-
             st.markdown("---")
-            st.markdown(f"### **Input Sequence:** `{''.join(st.session_state.oper)}`")
+            st.markdown(f"### **Input Sequence:** `{calc.display}`")
             st.markdown("---")
-            st.markdown(f"### **Movements Sequence:** `{','.join(st.session_state.mov)}`")
-
+            st.markdown(f"### **Movements Sequence:** `{','.join(arrows[g] for g in calc.history)}`")
 
-            # delete files from its temporary file after using it
-            hd.delete_file_safely(hfile)
-            hd.delete_file_safely(vfile)
         else:
-            if 'current_pos' not in st.session_state:
-                st.session_state.current_pos = (3, 3)
-
             # making  the calculator
             define_calculator()
 
             # printing the results
-            st.markdown(f"### **Input Sequence:** `{''.join(st.session_state.oper)}`")
+            st.markdown(f"### **Input Sequence:** `{calc.display}`")
             st.markdown("---")
-            st.markdown(f"### **Movements Sequence:** `{','.join(st.session_state.mov)}`")
+            st.markdown(f"### **Movements Sequence:** `{','.join(arrows[g] for g in calc.history)}`")
 
+    latency_panel()
     st.markdown("---")
     st.markdown("""
     ### ℹ️ About
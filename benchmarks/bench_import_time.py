@@ -0,0 +1,73 @@
+# Cold-start import cost of the modules each frontend pulls in, measured with `python -X importtime`.
+# Usage: python benchmarks/bench_import_time.py [--repeats N] [--output results.json]
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def deployment_imports(include_streamlit=False):
+    # Deployment.py runs deploy() when imported, so time its import statements instead of the module
+    with open(os.path.join(ROOT, 'Deployment.py'), encoding='utf-8') as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module:
+            modules.append(node.module)
+    return [m for m in modules if include_streamlit or m.split('.')[0] != 'streamlit']
+
+
+def import_time(modules):
+    """Wall time and per-module cumulative microseconds for importing `modules` in a fresh interpreter."""
+    code = '; '.join(f'import {m}' for m in modules) or 'pass'
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code], cwd=ROOT,
+                            capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        _, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = len(name) - len(name.lstrip()) - 1
+        if depth == 0:  # top-level imports only, their cumulative time includes everything below them
+            cumulative[name.strip()] = int(cumulative_us)
+    return {'total_us': sum(cumulative.values()), 'modules': cumulative}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import-time benchmark for the EOG frontends")
+    parser.add_argument('--repeats', type=int, default=5)
+    parser.add_argument('--with-streamlit', action='store_true', help="include streamlit itself")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    args = parser.parse_args()
+
+    targets = {
+        'handlingfunctions': ['handlingfunctions'],
+        'deployment_imports': deployment_imports(args.with_streamlit),
+        'first_prediction_deps': ['handlingfunctions', 'pandas', 'scipy.signal', 'joblib', 'sklearn.svm'],
+        'main': ['main']
+    }
+
+    results = {}
+    for name, modules in targets.items():
+        runs = [import_time(modules) for _ in range(args.repeats)]
+        best = min(runs, key=lambda r: r['total_us'])
+        results[name] = {'imports': modules, 'best_total_ms': best['total_us'] / 1e3, 'modules': best['modules']}
+        print(f"{name:24s} {best['total_us'] / 1e3:9.1f} ms  ({', '.join(modules)})")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
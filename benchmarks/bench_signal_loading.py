@@ -0,0 +1,64 @@
+# Compares the original validate_signal_file loop with hd.load_signal on the class/ corpus.
+# Usage: python benchmarks/bench_signal_loading.py [corpus_dir] [repeats]
+import glob
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+import handlingfunctions as hd
+
+
+def legacy_validate_signal_file(filepath):
+    # the pre-load_signal implementation, kept here as the baseline
+    try:
+        for encoding in ['utf-8', 'latin-1', 'cp1252']:
+            try:
+                with open(filepath, 'r', encoding=encoding) as f:
+                    content = f.read().strip().replace('\n', ',')
+                    values = [float(x) for x in content.split(',') if x.strip()]
+                    if len(values) < 10:
+                        raise ValueError("Signal too short")
+                    return np.array(values)
+            except UnicodeDecodeError:
+                continue
+        raise ValueError("Could not read file with any supported encoding")
+    except Exception as e:
+        raise ValueError(f"Invalid signal file: {str(e)}")
+
+
+def time_loader(loader, files, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for path in files:
+            loader(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    corpus = sys.argv[1] if len(sys.argv) > 1 else os.path.join(ROOT, 'class')
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    files = sorted(glob.glob(os.path.join(corpus, '**', '*.txt'), recursive=True))
+    if not files:
+        print(f"No .txt files found under {corpus}")
+        return
+
+    for path in files:
+        if not np.array_equal(legacy_validate_signal_file(path), hd.load_signal(path)):
+            raise AssertionError(f"Loaders disagree on {path}")
+
+    legacy = time_loader(legacy_validate_signal_file, files, repeats)
+    fast = time_loader(hd.load_signal, files, repeats)
+    print(f"files: {len(files)} (best of {repeats})")
+    print(f"legacy validate_signal_file: {legacy * 1e3:8.2f} ms  ({legacy / len(files) * 1e6:7.1f} us/file)")
+    print(f"hd.load_signal:              {fast * 1e3:8.2f} ms  ({fast / len(files) * 1e6:7.1f} us/file)")
+    print(f"speedup: {legacy / fast:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# End-to-end benchmark suite for every pipeline stage, headless (no Tk, no Streamlit).
+# Runs each stage on the bundled class/ recordings and on synthetically scaled inputs (longer signals,
+# larger batches), and reports wall time, net allocations and peak traced memory per stage.
+# Usage: python benchmarks/run_benchmarks.py [--output results.json] [--compare previous.json] [--quick]
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)  # model paths in handlingfunctions are relative to the repository root
+import handlingfunctions as hd
+
+
+def measure(fn, min_time=0.2, max_repeats=50):
+    """Timing over repeated calls plus one traced call for memory, after a warm-up call."""
+    fn()
+    times = []
+    start = time.perf_counter()
+    while len(times) < max_repeats and (len(times) < 3 or time.perf_counter() - start < min_time):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    tracemalloc.reset_peak()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    diff = after.compare_to(before, 'filename')
+    return {
+        'repeats': len(times),
+        'best_s': min(times),
+        'median_s': statistics.median(times),
+        'peak_bytes': peak,
+        'net_alloc_blocks': sum(d.count_diff for d in diff),
+        'net_alloc_bytes': sum(d.size_diff for d in diff)
+    }
+
+
+def load_corpus():
+    h_files = sorted(glob.glob(os.path.join(ROOT, 'class', '*', '*', '*h.txt')))
+    pairs = [(f, f[:-len('h.txt')] + 'v.txt') for f in h_files]
+    H = np.array([hd.load_signal(h) for h, _ in pairs])
+    V = np.array([hd.load_signal(v) for _, v in pairs])
+    return pairs, H, V
+
+
+def single_trial_pipeline(h_path, v_path):
+    return hd.predict_files(h_path, v_path)
+
+
+def stage_cases(pairs, H, V, quick=False):
+    """(stage, input description, n_trials, n_samples, callable) for every benchmark case."""
+    files = [p for pair in pairs for p in pair]
+    h_path, v_path = pairs[0]
+    n, m = H.shape
+    filtered = hd.butter_bandpass_filter(H, hd.LOW_CUTOFF, hd.HIGH_CUTOFF, hd.SAMPLE_RATE, hd.ORDER)
+    h_feat = hd.extract_morphological_features(filtered)
+    v_feat = hd.extract_morphological_features(
+        hd.butter_bandpass_filter(V, hd.LOW_CUTOFF, hd.HIGH_CUTOFF, hd.SAMPLE_RATE, hd.ORDER))
+    selected_one = hd.features_selection(h_feat[:1], v_feat[:1])
+
+    cases = [
+        ('parse', 'class/ files', len(files), m, lambda: [hd.validate_signal_file(f) for f in files]),
+        ('filter', 'single trial', 1, m,
+         lambda: hd.butter_bandpass_filter(H[0], hd.LOW_CUTOFF, hd.HIGH_CUTOFF, hd.SAMPLE_RATE, hd.ORDER)),
+        ('filter', 'class/ batch', n, m,
+         lambda: hd.butter_bandpass_filter(H, hd.LOW_CUTOFF, hd.HIGH_CUTOFF, hd.SAMPLE_RATE, hd.ORDER)),
+        ('features', 'single trial', 1, m, lambda: hd.extract_morphological_features(filtered[:1])),
+        ('features', 'class/ batch', n, m, lambda: hd.extract_morphological_features(filtered)),
+        ('features_selected', 'class/ batch', n, m,
+         lambda: hd.extract_morphological_features(filtered, selected_only=True)),
+        ('selection', 'single trial', 1, m, lambda: hd.features_selection(h_feat[:1], v_feat[:1])),
+        ('selection', 'class/ batch', n, m, lambda: hd.features_selection(h_feat, v_feat)),
+        ('prediction', 'single trial', 1, m, lambda: hd.prediction(selected_one)),
+        ('prediction_compiled', 'single trial', 1, m, lambda: hd.prediction(selected_one, 'compiled')),
+        ('pipeline', 'single trial from files', 1, m, lambda: single_trial_pipeline(h_path, v_path)),
+        ('classify_batch', 'class/ batch', n, m, lambda: hd.classify_batch(H, V)),
+        ('classify_batch_compiled', 'class/ batch', n, m, lambda: hd.classify_batch(H, V, 'compiled')),
+    ]
+
+    # synthetic scaling: longer signals and larger batches built by tiling the recordings
+    for factor in ([4] if quick else [4, 16]):
+        long_h, long_v = np.tile(H[:8], factor), np.tile(V[:8], factor)
+        cases.append(('filter', f'signals x{factor} longer', 8, m * factor,
+                      lambda x=long_h: hd.butter_bandpass_filter(x, hd.LOW_CUTOFF, hd.HIGH_CUTOFF,
+                                                                 hd.SAMPLE_RATE, hd.ORDER)))
+        cases.append(('classify_batch', f'signals x{factor} longer', 8, m * factor,
+                      lambda x=long_h, y=long_v: hd.classify_batch(x, y)))
+    for factor in ([10] if quick else [10, 50]):
+        big_h, big_v = np.tile(H, (factor, 1)), np.tile(V, (factor, 1))
+        cases.append(('classify_batch', f'batch x{factor}', n * factor, m,
+                      lambda x=big_h, y=big_v: hd.classify_batch(x, y)))
+        cases.append(('classify_batch_compiled', f'batch x{factor}', n * factor, m,
+                      lambda x=big_h, y=big_v: hd.classify_batch(x, y, 'compiled')))
+    return cases
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = None
+    versions = {}
+    for name in ('numpy', 'scipy', 'pandas', 'sklearn', 'joblib'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    return {
+        'commit': commit or None,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'versions': versions,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+
+def compare(results, previous_path):
+    with open(previous_path) as f:
+        previous = {(r['stage'], r['input']): r for r in json.load(f)['results']}
+    print(f"\ncompared with {previous_path}:")
+    for r in results:
+        old = previous.get((r['stage'], r['input']))
+        if old:
+            print(f"  {r['stage']:24s} {r['input']:24s} {old['best_s'] / r['best_s']:6.2f}x "
+                  f"({old['best_s'] * 1e3:.3f} -> {r['best_s'] * 1e3:.3f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every EOG pipeline stage")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--compare', help="previous JSON results to compare against")
+    parser.add_argument('--quick', action='store_true', help="fewer scaled inputs and shorter timing")
+    args = parser.parse_args()
+
+    pairs, H, V = load_corpus()
+    hd.get_model()
+    hd.get_model('compiled')
+
+    results = []
+    print(f"{'stage':24s} {'input':24s} {'trials':>7s} {'best ms':>10s} {'us/trial':>10s} {'peak KiB':>9s}")
+    for stage, desc, n_trials, n_samples, fn in stage_cases(pairs, H, V, args.quick):
+        r = measure(fn, min_time=0.05 if args.quick else 0.2)
+        r.update({'stage': stage, 'input': desc, 'n_trials': n_trials, 'n_samples': n_samples,
+                  'per_trial_us': r['best_s'] / n_trials * 1e6})
+        results.append(r)
+        print(f"{stage:24s} {desc:24s} {n_trials:7d} {r['best_s'] * 1e3:10.3f} {r['per_trial_us']:10.1f} "
+              f"{r['peak_bytes'] / 1024:9.1f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'environment': environment(), 'results': results}, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
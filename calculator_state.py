@@ -0,0 +1,235 @@
+# Headless calculator and navigation engine shared by both frontends: every predicted gesture goes through
+# Calculator.apply(label), and the Tk window / Streamlit page only render the resulting state.
+# Expressions are tokenized as keys arrive and evaluated incrementally with exact fractions (no eval),
+# operands can have any number of digits and * and / bind tighter than + and -.
+from collections import deque
+from fractions import Fraction
+
+import navigation
+
+# the keypad, '' cells are empty; both frontends draw this grid
+KEYPAD_LABELS = [
+    ['', '', '', '4', '', '', ''],
+    ['', '', '5', '6', '7', '', ''],
+    ['', '1', '', '', '', '9', ''],
+    ['0', '2', '', '.', '', 'E', '8'],
+    ['', '3', '', '', '', 'C', ''],
+    ['', '', '/', '+', '-', '', ''],
+    ['', '', '', '*', '', '', '']
+]
+CENTER = (3, 3)
+MAX_HISTORY = 5
+OPERATORS = '+-*/'
+DIGITS = '0123456789'
+
+ARROWS = {
+    "up": "↑",
+    "down": "↓",
+    "left": "←",
+    "right": "→",
+    "blink": "✅",  # Optional: for 'blink' or selection
+    "C": "🔄"   # Optional: for reset or clear
+}
+
+
+class Keypad:
+    """Button labels by position plus the navigation table between buttons (empty cells are never selected)."""
+
+    def __init__(self, labels=KEYPAD_LABELS, center=CENTER):
+        self.labels = labels
+        self.center = center
+        self.buttons = {(r, c): label for r, row in enumerate(labels) for c, label in enumerate(row) if label}
+        if center not in self.buttons:
+            raise ValueError("The keypad center must be a button")
+        self.navigation = navigation.compile_nearest_navigation(self.buttons)
+
+
+KEYPAD = Keypad()
+
+
+def format_number(value):
+    if value is None:
+        return ""
+    if value.denominator == 1:
+        return str(value.numerator)
+    return f"{float(value):.12g}"
+
+
+def tokenize(text):
+    """Numbers (as Fractions) and operator characters; a trailing operator is kept."""
+    tokens, number = [], ''
+    for ch in text:
+        if ch in DIGITS or ch == '.':
+            number += ch
+        elif ch in OPERATORS:
+            if not number:
+                raise ValueError(f"Operator {ch!r} without a left operand in {text!r}")
+            tokens.extend([Fraction(number), ch])
+            number = ''
+        else:
+            raise ValueError(f"Unexpected character {ch!r} in {text!r}")
+    if number:
+        tokens.append(Fraction(number))
+    return tokens
+
+
+def evaluate(text):
+    """Value of a whole expression with the usual precedence, ignoring a trailing operator; None if empty."""
+    tokens = tokenize(text)
+    if tokens and isinstance(tokens[-1], str):
+        tokens.pop()
+    if not tokens:
+        return None
+    terms = [tokens[0]]
+    for op, number in zip(tokens[1::2], tokens[2::2]):
+        if op == '*':
+            terms[-1] *= number
+        elif op == '/':
+            terms[-1] /= number  # ZeroDivisionError propagates
+        else:
+            terms.append(number if op == '+' else -number)
+    return sum(terms)
+
+
+class Calculator:
+    """
+    Calculator and selector state. Committed operands are folded into a running sum of terms and the
+    current product term when an operator is pressed, so a key press costs O(1) whatever the expression
+    length; `result` combines them with the operand being typed.
+    """
+
+    __slots__ = ('keypad', 'expression', 'position', 'history', 'error', 'quit', 'last_action',
+                 '_number', '_sum', '_sign', '_term', '_mul', '_undo')
+
+    def __init__(self, keypad=KEYPAD):
+        self.keypad = keypad
+        self.history = deque(maxlen=MAX_HISTORY)
+        self.reset()
+
+    def reset(self):
+        self.position = self.keypad.center
+        self.history.clear()
+        self.quit = False
+        self.last_action = None
+        self.clear()
+
+    def clear(self):
+        self.expression = ''
+        self.error = None
+        self._number = ''  # digits of the operand being typed
+        self._sum = Fraction(0)  # completed terms
+        self._sign = 1  # sign of the current term
+        self._term = None  # product of the current term's committed operands
+        self._mul = None  # '*' or '/' pending between _term and _number
+        self._undo = None  # state before the last operator, so a second operator can replace it
+
+    def apply(self, gesture):
+        """Handle one predicted gesture; a blink presses the selected key and recentres the selector."""
+        # error and quit describe the latest gesture only
+        self.error = None
+        self.quit = False
+        self.history.append(gesture)
+        if gesture == 'blink':
+            key = self.keypad.buttons[self.position]
+            self.position = self.keypad.center
+            self.last_action = ('pressed', key)
+            self.press(key)
+        else:
+            new_pos = navigation.move(self.keypad.navigation, self.position, gesture)
+            if new_pos is None:
+                self.last_action = ('blocked', gesture)
+            else:
+                self.position = new_pos
+                self.last_action = ('moved', gesture)
+        return self.last_action
+
+    def press(self, key):
+        """Press one key directly; like apply(), error and quit describe this key only."""
+        self.error = None
+        self.quit = False
+        if key in DIGITS:
+            if self._number == '0':
+                # no leading zeros: "0" followed by a digit becomes that digit
+                self.expression = self.expression[:-1]
+                self._number = ''
+            self._number += key
+            self.expression += key
+        elif key == '.':
+            if '.' not in self._number:
+                text = '.' if self._number else '0.'
+                self._number += text
+                self.expression += text
+        elif key in OPERATORS:
+            self._operator(key)
+        elif key == 'C':
+            self.clear()
+        elif key == 'E':
+            self.quit = True
+        else:
+            raise ValueError(f"Unknown key {key!r}")
+
+    def _operator(self, op):
+        if not self._number:
+            if self._undo is None:
+                return  # nothing to apply the operator to yet
+            # operator right after an operator: replace it
+            self._sum, self._sign, self._term, self._mul, self._number = self._undo
+            self.expression = self.expression[:-1]
+
+        operand = Fraction(self._number)
+        if self._mul == '/' and operand == 0:
+            self.error = "Division by zero"
+            return
+        undo = (self._sum, self._sign, self._term, self._mul, self._number)
+        if self._mul is None:
+            term = operand
+        elif self._mul == '*':
+            term = self._term * operand
+        else:
+            term = self._term / operand
+        if op in '*/':
+            self._term, self._mul = term, op
+        else:
+            self._sum += self._sign * term
+            self._sign = 1 if op == '+' else -1
+            self._term, self._mul = None, None
+        self._undo = undo
+        self._number = ''
+        self.expression += op
+
+    @property
+    def result(self):
+        """Exact value of the expression so far (a trailing operator is ignored), None if empty or undefined."""
+        if not self.expression:
+            return None
+        if not self._number:
+            if self._term is None:
+                return self._sum
+            return self._sum + self._sign * self._term
+        operand = Fraction(self._number)
+        if self._mul is None:
+            term = operand
+        elif self._mul == '*':
+            term = self._term * operand
+        elif operand == 0:
+            return None
+        else:
+            term = self._term / operand
+        return self._sum + self._sign * term
+
+    @property
+    def display(self):
+        """Expression, followed by its value once it contains an operator."""
+        if self._undo is None:
+            return self.expression
+        result = self.result
+        return f"{self.expression} = {format_number(result) if result is not None else '…'}"
+
+    def snapshot(self):
+        return {
+            'expression': self.expression,
+            'result': format_number(self.result),
+            'position': list(self.position),
+            'history': list(self.history),
+            'quit': self.quit
+        }
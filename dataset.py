@@ -0,0 +1,200 @@
+# Builds the class/ corpus into memory-mappable .npy arrays with a manifest of source mtimes, so later
+# runs reload in milliseconds and only re-parse files that changed.
+# Usage: python dataset.py class/Train class/Test [--cache-dir dataset_cache] [--workers N] [--csv]
+import argparse
+import glob
+import json
+import os
+import time
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import handlingfunctions as hd
+
+CACHE_DIR = "dataset_cache"
+MANIFEST_VERSION = 1
+# folder name -> label id, the inverse of hd.label_map
+class_labels = {name: label for label, name in hd.label_map.items()}
+
+Dataset = namedtuple('Dataset', ['h', 'v', 'labels', 'lengths', 'trial_ids'])
+
+
+def find_trials(split_dir):
+    """{trial id: (label, h path, v path)} for every class folder, pairing *h.txt with *v.txt."""
+    trials = {}
+    for class_dir in sorted(glob.glob(os.path.join(split_dir, '*'))):
+        class_key = os.path.basename(class_dir).lower()
+        if not os.path.isdir(class_dir) or class_key not in class_labels:
+            continue
+        for h_file in sorted(glob.glob(os.path.join(class_dir, '*h.txt'))):
+            v_file = h_file[:-len('h.txt')] + 'v.txt'
+            if not os.path.exists(v_file):
+                continue
+            trial_id = os.path.join(os.path.basename(class_dir), os.path.basename(h_file)[:-len('h.txt')])
+            trials[trial_id] = (class_labels[class_key], h_file, v_file)
+    return trials
+
+
+def _file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _cache_paths(cache_dir, split_dir):
+    name = os.path.basename(os.path.normpath(split_dir)).lower()
+    base = os.path.join(cache_dir, name)
+    return {
+        'h': base + '_h.npy',
+        'v': base + '_v.npy',
+        'labels': base + '_labels.npy',
+        'lengths': base + '_lengths.npy',
+        'manifest': base + '_manifest.json'
+    }
+
+
+def _save_array(path, array):
+    # write then rename, so a reader never maps a half-written file
+    tmp = path + '.tmp'
+    with open(tmp, 'wb') as f:
+        np.save(f, array)
+    os.replace(tmp, path)
+
+
+def load_dataset(split_dir, cache_dir=CACHE_DIR, mmap_mode='r'):
+    """Cached arrays for split_dir without checking sources, or None when there is no cache."""
+    paths = _cache_paths(cache_dir, split_dir)
+    if not os.path.exists(paths['manifest']):
+        return None
+    with open(paths['manifest']) as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+    return Dataset(
+        np.load(paths['h'], mmap_mode=mmap_mode),
+        np.load(paths['v'], mmap_mode=mmap_mode),
+        np.load(paths['labels'], mmap_mode=mmap_mode),
+        np.load(paths['lengths'], mmap_mode=mmap_mode),
+        list(manifest['trials'])
+    ), manifest
+
+
+def _parse_files(paths, workers):
+    if workers == 1 or len(paths) < 64:
+        return [hd.load_signal(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(hd.load_signal, paths, chunksize=max(1, len(paths) // (4 * (workers or os.cpu_count())))))
+
+
+def build_dataset(split_dir, cache_dir=CACHE_DIR, workers=None, verbose=False):
+    """
+    Parse split_dir into padded (n_trials, max_len) H/V float arrays (NaN beyond each trial's length),
+    reusing cached rows whose source files are unchanged; returns a Dataset of memory-mapped arrays.
+    """
+    start = time.perf_counter()
+    trials = find_trials(split_dir)
+    if not trials:
+        raise ValueError(f"No H/V trial pairs found under {split_dir}")
+
+    paths = _cache_paths(cache_dir, split_dir)
+    cached = load_dataset(split_dir, cache_dir)
+    old_rows = {}
+    if cached is not None:
+        data, manifest = cached
+        for i, trial_id in enumerate(manifest['trials']):
+            old_rows[trial_id] = (i, manifest['files'][trial_id])
+
+    trial_ids = sorted(trials)
+    stamps = {t: [_file_stamp(trials[t][1]), _file_stamp(trials[t][2])] for t in trial_ids}
+    stale = [t for t in trial_ids if t not in old_rows or old_rows[t][1] != stamps[t]]
+    if cached is not None and not stale and len(old_rows) == len(trial_ids):
+        if verbose:
+            print(f"{split_dir}: {len(trial_ids)} trials, cache up to date ({time.perf_counter() - start:.3f}s)")
+        return cached[0]
+
+    parsed = _parse_files([p for t in stale for p in trials[t][1:]], workers)
+    fresh = {t: (parsed[2 * i], parsed[2 * i + 1]) for i, t in enumerate(stale)}
+
+    lengths = np.empty((len(trial_ids), 2), dtype=np.int64)
+    rows = []
+    for k, t in enumerate(trial_ids):
+        if t in fresh:
+            h, v = fresh[t]
+        else:
+            i = old_rows[t][0]
+            h = data.h[i, :data.lengths[i, 0]]
+            v = data.v[i, :data.lengths[i, 1]]
+        lengths[k] = len(h), len(v)
+        rows.append((h, v))
+
+    width = int(lengths.max())
+    h_all = np.full((len(trial_ids), width), np.nan)
+    v_all = np.full((len(trial_ids), width), np.nan)
+    for k, (h, v) in enumerate(rows):
+        h_all[k, :len(h)] = h
+        v_all[k, :len(v)] = v
+    labels = np.array([trials[t][0] for t in trial_ids], dtype=np.int64)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    _save_array(paths['h'], h_all)
+    _save_array(paths['v'], v_all)
+    _save_array(paths['labels'], labels)
+    _save_array(paths['lengths'], lengths)
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'split_dir': os.path.abspath(split_dir),
+        'trials': trial_ids,
+        'files': stamps
+    }
+    tmp = paths['manifest'] + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp, paths['manifest'])
+
+    if verbose:
+        print(f"{split_dir}: {len(trial_ids)} trials, parsed {len(stale)} "
+              f"({time.perf_counter() - start:.3f}s)")
+    return load_dataset(split_dir, cache_dir)[0]
+
+
+def trial_signals(dataset):
+    """H and V signals as 2-D arrays when every trial has the same length, else lists of 1-D views."""
+    lengths = np.asarray(dataset.lengths)
+    if (lengths == lengths[0, 0]).all():
+        width = int(lengths[0, 0])
+        return dataset.h[:, :width], dataset.v[:, :width]
+    h = [dataset.h[i, :n] for i, n in enumerate(lengths[:, 0])]
+    v = [dataset.v[i, :n] for i, n in enumerate(lengths[:, 1])]
+    return h, v
+
+
+def export_csv(dataset, horizontal_file, vertical_file):
+    # same layout as read_and_process_signal_files in EOG2.ipynb: samples then label, one trial per row
+    with open(horizontal_file, 'w') as csv_h, open(vertical_file, 'w') as csv_v:
+        for i, label in enumerate(dataset.labels):
+            h = dataset.h[i, :dataset.lengths[i, 0]]
+            v = dataset.v[i, :dataset.lengths[i, 1]]
+            csv_h.write(','.join(np.format_float_positional(x, trim='-') for x in h) + f',{label}\n')
+            csv_v.write(','.join(np.format_float_positional(x, trim='-') for x in v) + f',{label}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build cached .npy datasets from class/ style folders")
+    parser.add_argument('splits', nargs='*', default=[os.path.join('class', 'Train'), os.path.join('class', 'Test')])
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--csv', action='store_true', help="also write data_<split>_{h,v}.csv like EOG2.ipynb")
+    args = parser.parse_args()
+
+    for split_dir in args.splits:
+        dataset = build_dataset(split_dir, args.cache_dir, args.workers, verbose=True)
+        counts = {hd.label_map[k]: int(n) for k, n in zip(*np.unique(dataset.labels, return_counts=True))}
+        print(f"  labels: {counts}")
+        if args.csv:
+            name = os.path.basename(os.path.normpath(split_dir)).lower()
+            export_csv(dataset, f'data_{name}_h.csv', f'data_{name}_v.csv')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,206 @@
+# Evaluation harness replacing the accuracy / confusion matrix cells of EOG2.ipynb and the test notebook.
+# `test` runs the production single-trial pipeline (the one main.py uses) over every H/V pair of a split
+# in a process pool and reports accuracy, per-class precision/recall, the confusion matrix and per-trial
+# latency; `cv` runs stratified k-fold cross-validation on a split with the folds fitted in parallel.
+# Usage: python evaluate.py test [class/Test] [--model morphological] [--output results.json]
+#        python evaluate.py cv [class/Train] [--folds 5] [--features morphological] [--output cv.json]
+import argparse
+import json
+import os
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import dataset
+import handlingfunctions as hd
+import train
+
+CLASS_NAMES = [hd.label_map[k] for k in sorted(hd.label_map)]
+
+
+def classification_metrics(y_true, y_pred, classes=CLASS_NAMES):
+    """Accuracy, per-class precision/recall/F1/support and the confusion matrix (rows true, columns predicted)."""
+    index = {name: i for i, name in enumerate(classes)}
+    confusion = np.zeros((len(classes), len(classes)), dtype=np.int64)
+    for t, p in zip(y_true, y_pred):
+        if p in index:
+            confusion[index[t], index[p]] += 1
+    true_positive = np.diag(confusion)
+    predicted = confusion.sum(axis=0)
+    support = confusion.sum(axis=1)
+    precision = np.divide(true_positive, predicted, out=np.zeros(len(classes)), where=predicted > 0)
+    recall = np.divide(true_positive, support, out=np.zeros(len(classes)), where=support > 0)
+    f1 = np.divide(2 * precision * recall, precision + recall, out=np.zeros(len(classes)),
+                   where=precision + recall > 0)
+    return {
+        'accuracy': float(np.mean([t == p for t, p in zip(y_true, y_pred)])) if len(y_true) else None,
+        'per_class': {
+            name: {'precision': float(precision[i]), 'recall': float(recall[i]), 'f1': float(f1[i]),
+                   'support': int(support[i])}
+            for i, name in enumerate(classes)
+        },
+        'confusion_matrix': {'labels': list(classes), 'matrix': confusion.tolist()}
+    }
+
+
+def latency_summary(seconds):
+    seconds = np.asarray(seconds, dtype=float)
+    if not seconds.size:
+        return {}
+    return {
+        'mean_ms': float(seconds.mean() * 1e3),
+        'p50_ms': float(np.percentile(seconds, 50) * 1e3),
+        'p95_ms': float(np.percentile(seconds, 95) * 1e3),
+        'p99_ms': float(np.percentile(seconds, 99) * 1e3),
+        'max_ms': float(seconds.max() * 1e3)
+    }
+
+
+def _init_worker(model_name):
+    hd.get_model(model_name)  # pay for loading once per worker, not inside the first timed trial
+
+
+def _predict_trial(args):
+    # the production pipeline main.py and Deployment.py run
+    trial_id, h_path, v_path, model_name = args
+    start = time.perf_counter()
+    label = hd.predict_files(h_path, v_path, model_name)
+    return trial_id, label, time.perf_counter() - start
+
+
+def evaluate_split(split_dir, model_name='morphological', workers=None):
+    trials = dataset.find_trials(split_dir)
+    if not trials:
+        raise ValueError(f"No H/V trial pairs found under {split_dir}")
+    hd.model_registry.mtime(model_name)  # a missing model file fails here, not inside the pool initializer
+    jobs = [(t, h, v, model_name) for t, (_, h, v) in sorted(trials.items())]
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(model_name,)) as pool:
+        chunksize = max(1, len(jobs) // (4 * (workers or os.cpu_count())))
+        results = list(pool.map(_predict_trial, jobs, chunksize=chunksize))
+    wall = time.perf_counter() - start
+
+    y_true = [hd.label_map[trials[t][0]] for t, _, _ in results]
+    y_pred = [label for _, label, _ in results]
+    report = classification_metrics(y_true, y_pred)
+    report.update({
+        'split_dir': os.path.abspath(split_dir),
+        'model': model_name,
+        'model_path': hd.model_registry.paths[model_name],
+        'n_trials': len(results),
+        'latency': latency_summary([seconds for _, _, seconds in results]),
+        'wall_seconds': wall,
+        'errors': [{'trial': t, 'true': y, 'predicted': p} for (t, p, _), y in zip(results, y_true) if y != p]
+    })
+    return report
+
+
+def _fit_fold(args):
+    from sklearn.svm import SVC
+
+    params, X, y, train_index, test_index = args
+    start = time.perf_counter()
+    model = SVC(**params).fit(X[train_index], y[train_index])
+    return test_index, model.predict(X[test_index]), time.perf_counter() - start
+
+
+def cross_validate(split_dir, folds=5, feature_set='morphological', params=None, workers=None, seed=0):
+    """Stratified k-fold over split_dir with the shipped model's hyper-parameters, one process per fold."""
+    import joblib
+    from sklearn.model_selection import StratifiedKFold
+
+    if params is None:
+        params = {k: v for k, v in hd.get_model().get_params().items() if k in ('C', 'gamma', 'kernel')}
+    memory = joblib.Memory(os.path.join(train.CACHE_DIR, 'features'), verbose=0)
+    X, y, columns = train.build_features(split_dir, feature_set, memory)
+    X = np.asarray(X, dtype=float)
+
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(X, y))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_fit_fold, [(params, X, y, tr, te) for tr, te in splits]))
+    wall = time.perf_counter() - start
+
+    predicted = np.empty_like(y)
+    fold_accuracy, fit_seconds = [], []
+    for test_index, fold_pred, seconds in results:
+        predicted[test_index] = fold_pred
+        fold_accuracy.append(float(np.mean(fold_pred == y[test_index])))
+        fit_seconds.append(seconds)
+
+    report = classification_metrics([hd.label_map[k] for k in y], [hd.label_map[k] for k in predicted])
+    report.update({
+        'split_dir': os.path.abspath(split_dir),
+        'feature_set': feature_set,
+        'feature_columns': columns,
+        'params': params,
+        'n_trials': int(len(y)),
+        'folds': folds,
+        'seed': seed,
+        'fold_accuracy': fold_accuracy,
+        'accuracy_std': float(np.std(fold_accuracy)),
+        'fit_seconds': fit_seconds,
+        'wall_seconds': wall
+    })
+    return report
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit or None, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def print_report(report):
+    print(f"accuracy: {report['accuracy']:.4f}  ({report['n_trials']} trials)")
+    print(f"{'class':8s} {'precision':>9s} {'recall':>7s} {'f1':>6s} {'support':>8s}")
+    for name, r in report['per_class'].items():
+        print(f"{name:8s} {r['precision']:9.3f} {r['recall']:7.3f} {r['f1']:6.3f} {r['support']:8d}")
+    labels = report['confusion_matrix']['labels']
+    print("confusion matrix (rows true, columns predicted):")
+    print("         " + " ".join(f"{name:>6s}" for name in labels))
+    for name, row in zip(labels, report['confusion_matrix']['matrix']):
+        print(f"{name:8s} " + " ".join(f"{n:6d}" for n in row))
+    if report.get('latency'):
+        lat = report['latency']
+        print(f"per-trial latency: mean {lat['mean_ms']:.2f} ms, p50 {lat['p50_ms']:.2f} ms, "
+              f"p99 {lat['p99_ms']:.2f} ms")
+    if 'fold_accuracy' in report:
+        print("fold accuracy: " + ", ".join(f"{a:.3f}" for a in report['fold_accuracy']) +
+              f" (std {report['accuracy_std']:.3f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate the EOG gesture pipeline")
+    commands = parser.add_subparsers(dest='command', required=True)
+    test = commands.add_parser('test', help="run the production pipeline over a split")
+    test.add_argument('split', nargs='?', default=os.path.join('class', 'Test'))
+    test.add_argument('--model', default='morphological', choices=hd.model_registry.available())
+    cv = commands.add_parser('cv', help="stratified k-fold cross-validation")
+    cv.add_argument('split', nargs='?', default=os.path.join('class', 'Train'))
+    cv.add_argument('--folds', type=int, default=5)
+    cv.add_argument('--features', default='morphological', help="feature sets as in train.py --features")
+    cv.add_argument('--seed', type=int, default=0)
+    for command in (test, cv):
+        command.add_argument('--workers', type=int, default=None)
+        command.add_argument('--output', help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    if args.command == 'test':
+        report = evaluate_split(args.split, args.model, args.workers)
+    else:
+        report = cross_validate(args.split, args.folds, args.features, workers=args.workers, seed=args.seed)
+    report['environment'] = environment()
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
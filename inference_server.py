@@ -0,0 +1,341 @@
+# Local inference service shared by every frontend session: one model in memory, concurrent requests
+# coalesced into micro-batches (up to --max-batch trials or --max-wait-ms) and evaluated with one
+# hd.classify_batch call on a worker pool. The asyncio front end speaks plain HTTP/1.1 over TCP or a
+# Unix socket; a full request queue is answered with 503 so callers back off instead of piling up.
+# Usage: python inference_server.py [--port 8765 | --unix /tmp/eog.sock] [--max-batch 32] [--max-wait-ms 5]
+#   POST /predict {"h": [...], "v": [...], "model": "morphological"} -> {"label": ..., "scores": [...]}
+#   GET /health -> queue and batching statistics
+import argparse
+import asyncio
+import http.client
+import json
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import handlingfunctions as hd
+
+DEFAULT_PORT = 8765
+MAX_BATCH = 32
+MAX_WAIT = 0.005
+MAX_QUEUE = 256
+MAX_BODY = 16 * 1024 * 1024
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 413: 'Payload Too Large',
+           500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+class MicroBatcher:
+    """
+    Collects (h, v, model name) requests from the event loop and runs them in batches on a thread pool.
+    A batch is closed when it holds max_batch trials or max_wait seconds after its first request;
+    at most `workers` batches are evaluated at the same time.
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, max_wait=MAX_WAIT, max_queue=MAX_QUEUE, workers=2):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = asyncio.Queue(maxsize=max_queue)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='eog-infer')
+        self._slots = asyncio.Semaphore(workers)
+        self._task = None
+        self.stats = {'requests': 0, 'rejected': 0, 'batches': 0, 'trials': 0, 'max_batch_seen': 0,
+                      'busy_seconds': 0.0}
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self.executor.shutdown(wait=True)
+
+    def submit(self, h_signal, v_signal, model_name='morphological'):
+        """Future resolving to (label, scores); raises asyncio.QueueFull when the server is saturated."""
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self.queue.put_nowait((h_signal, v_signal, model_name, future))
+        except asyncio.QueueFull:
+            self.stats['rejected'] += 1
+            raise
+        self.stats['requests'] += 1
+        return future
+
+    async def _collect(self):
+        batch = [await self.queue.get()]
+        deadline = asyncio.get_running_loop().time() + self.max_wait
+        while len(batch) < self.max_batch:
+            # take whatever is already queued before waiting on the clock
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            await self._slots.acquire()
+            task = loop.create_task(self._evaluate(batch))
+            task.add_done_callback(lambda _: self._slots.release())
+
+    async def _evaluate(self, batch):
+        loop = asyncio.get_running_loop()
+        by_model = {}
+        for item in batch:
+            by_model.setdefault(item[2], []).append(item)
+        for model_name, items in by_model.items():
+            start = time.perf_counter()
+            try:
+                labels, scores = await loop.run_in_executor(
+                    self.executor, hd.classify_batch, [i[0] for i in items], [i[1] for i in items], model_name)
+            except Exception as e:
+                for item in items:
+                    if not item[3].done():
+                        item[3].set_exception(e)
+                continue
+            finally:
+                self.stats['busy_seconds'] += time.perf_counter() - start
+            self.stats['batches'] += 1
+            self.stats['trials'] += len(items)
+            self.stats['max_batch_seen'] = max(self.stats['max_batch_seen'], len(items))
+            for item, label, score in zip(items, labels, scores):
+                if not item[3].done():  # the client may have gone away
+                    item[3].set_result((label, score))
+
+    def health(self):
+        stats = dict(self.stats)
+        stats['queued'] = self.queue.qsize()
+        stats['mean_batch'] = stats['trials'] / stats['batches'] if stats['batches'] else None
+        return stats
+
+
+def _parse_trial(body):
+    try:
+        payload = json.loads(body)
+        h_signal = np.asarray(payload['h'], dtype=float)
+        v_signal = np.asarray(payload['v'], dtype=float)
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid request body: {e}")
+    model_name = payload.get('model', 'morphological')
+    if model_name not in hd.model_registry.paths:
+        raise ValueError(f"Unknown model: {model_name}")
+    for name, signal in (('h', h_signal), ('v', v_signal)):
+        if signal.ndim != 1 or len(signal) < 10:
+            raise ValueError(f"Signal '{name}' must be a list of at least 10 numbers")
+        if not np.isfinite(signal).all():
+            raise ValueError(f"Signal '{name}' contains non-finite values")
+    return h_signal, v_signal, model_name
+
+
+class InferenceServer:
+    def __init__(self, batcher):
+        self.batcher = batcher
+
+    async def _respond(self, writer, status, payload, keep_alive=True, headers=()):
+        body = json.dumps(payload).encode()
+        head = [f"HTTP/1.1 {status} {REASONS[status]}", "Content-Type: application/json",
+                f"Content-Length: {len(body)}", "Connection: " + ("keep-alive" if keep_alive else "close")]
+        head.extend(headers)
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode() + body)
+        await writer.drain()
+
+    async def handle(self, reader, writer):
+        # one connection, any number of keep-alive requests
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                except ValueError:
+                    await self._respond(writer, 400, {'error': 'Malformed request line'}, keep_alive=False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': 'Request body too large'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                status, payload, extra = await self.dispatch(method, path, body)
+                await self._respond(writer, status, payload, keep_alive, extra)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method, path, body):
+        path = path.split('?', 1)[0]
+        if path == '/health':
+            return 200, self.batcher.health(), ()
+        if path != '/predict':
+            return 404, {'error': f'Unknown path {path}'}, ()
+        if method != 'POST':
+            return 405, {'error': 'Use POST'}, ()
+        try:
+            h_signal, v_signal, model_name = _parse_trial(body)
+            future = self.batcher.submit(h_signal, v_signal, model_name)
+        except ValueError as e:
+            return 400, {'error': str(e)}, ()
+        except asyncio.QueueFull:
+            return 503, {'error': 'Server busy'}, ('Retry-After: 1',)
+        try:
+            label, scores = await future
+        except ValueError as e:
+            return 400, {'error': str(e)}, ()
+        except Exception as e:
+            return 500, {'error': str(e)}, ()
+        return 200, {'label': label, 'scores': np.asarray(scores).tolist()}, ()
+
+
+async def serve(host='127.0.0.1', port=DEFAULT_PORT, unix_path=None, max_batch=MAX_BATCH, max_wait=MAX_WAIT,
+                max_queue=MAX_QUEUE, workers=2, models=('morphological',), ready=None):
+    for name in models:
+        hd.get_model(name)  # load before accepting connections so the first requests are not slow
+    batcher = MicroBatcher(max_batch, max_wait, max_queue, workers)
+    batcher.start()
+    server = InferenceServer(batcher)
+    if unix_path:
+        listener = await asyncio.start_unix_server(server.handle, path=unix_path)
+    else:
+        listener = await asyncio.start_server(server.handle, host, port)
+    if ready is not None:
+        ready(listener)
+    try:
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await batcher.stop()
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path, timeout):
+        super().__init__('localhost', timeout=timeout)
+        self.unix_path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.unix_path)
+
+
+class InferenceClient:
+    """
+    Blocking client for the inference server, one keep-alive connection per calling thread.
+    `address` is "http://host:port" or "unix:/path/to.sock".
+    """
+
+    def __init__(self, address, timeout=10.0, retries=3):
+        self.address = address
+        self.timeout = timeout
+        self.retries = retries
+        self._local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            if self.address.startswith('unix:'):
+                conn = _UnixHTTPConnection(self.address[len('unix:'):], self.timeout)
+            else:
+                hostport = self.address.split('://', 1)[-1].rstrip('/')
+                conn = http.client.HTTPConnection(hostport, timeout=self.timeout)
+            self._local.conn = conn
+        return conn
+
+    def _request(self, method, path, payload=None):
+        body = None if payload is None else json.dumps(payload)
+        headers = {'Content-Type': 'application/json'} if body else {}
+        for attempt in range(self.retries + 1):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                data = json.loads(response.read() or b'{}')
+            except (ConnectionError, http.client.HTTPException, socket.timeout):
+                # stale keep-alive connection: reconnect once per attempt
+                conn.close()
+                self._local.conn = None
+                if attempt == self.retries:
+                    raise
+                continue
+            if response.status == 503 and attempt < self.retries:
+                time.sleep(0.05 * 2 ** attempt)
+                continue
+            if response.status == 400:
+                raise ValueError(data.get('error', 'Bad request'))
+            if response.status != 200:
+                raise RuntimeError(f"Inference server error {response.status}: {data.get('error')}")
+            return data
+
+    def predict(self, h_signal, v_signal, model_name='morphological'):
+        """(label, scores) for one H/V trial."""
+        data = self._request('POST', '/predict', {
+            'h': np.asarray(h_signal, dtype=float).tolist(),
+            'v': np.asarray(v_signal, dtype=float).tolist(),
+            'model': model_name
+        })
+        return data['label'], data['scores']
+
+    def predict_files(self, h_source, v_source, model_name='morphological'):
+        # files are parsed here so .xlsx uploads and paths work like the inline pipeline
+        return self.predict(hd.validate_signal_file(h_source), hd.validate_signal_file(v_source), model_name)
+
+    def health(self):
+        return self._request('GET', '/health')
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve EOG gesture predictions with micro-batching")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--unix', help="listen on this Unix socket path instead of TCP")
+    parser.add_argument('--max-batch', type=int, default=MAX_BATCH)
+    parser.add_argument('--max-wait-ms', type=float, default=MAX_WAIT * 1e3)
+    parser.add_argument('--max-queue', type=int, default=MAX_QUEUE, help="queued trials before answering 503")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--models', nargs='+', default=['morphological'], choices=hd.model_registry.available())
+    args = parser.parse_args()
+
+    where = f"unix:{args.unix}" if args.unix else f"http://{args.host}:{args.port}"
+    try:
+        asyncio.run(serve(args.host, args.port, args.unix, args.max_batch, args.max_wait_ms / 1e3,
+                          args.max_queue, args.workers, args.models,
+                          ready=lambda _: print(f"serving on {where}", flush=True)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+# Hot-path instrumentation for the handlingfunctions stages: per-stage timers, counters, latency
+# histograms and per-prediction traces (stage timings, feature vector, label) sent to pluggable sinks.
+# Disabled by default; a disabled stage timer is a shared no-op context manager.
+# Environment: EOG_METRICS=1 enables it, EOG_METRICS_JSONL=<path> adds a JSON lines sink and
+# EOG_METRICS_PORT=<port> serves Prometheus text format on http://127.0.0.1:<port>/metrics
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# seconds, upper bounds of the latency histogram buckets
+BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+           float('inf'))
+
+
+class _NullContext:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL = _NullContext()
+
+
+class Histogram:
+    """Cumulative bucket counts for Prometheus plus a bounded window of raw values for percentiles."""
+
+    def __init__(self, buckets=BUCKETS, window=1024):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0.0
+        self.count = 0
+        self.recent = deque(maxlen=window)
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.total += value
+        self.count += 1
+        self.recent.append(value)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(round(q / 100.0 * (len(values) - 1))))]
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else None,
+            'p50': self.percentile(50),
+            'p99': self.percentile(99),
+            'last': self.recent[-1] if self.recent else None
+        }
+
+
+class _StageTimer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _Trace:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.record = {'name': name, 'stages': {}}
+
+    def __enter__(self):
+        self.previous = getattr(self.metrics._local, 'trace', None)
+        self.metrics._local.trace = self
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics._local.trace = self.previous
+        self.record['total'] = time.perf_counter() - self.start
+        self.record['ts'] = time.time()
+        if exc is not None:
+            self.record['error'] = str(exc)
+        self.metrics.observe('total', self.record['total'], trace=False)
+        self.metrics.emit(self.record)
+        return False
+
+
+class Instrumentation:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.sinks = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def stage(self, name):
+        """Context manager timing one pipeline stage (no-op while disabled)."""
+        if not self.enabled:
+            return _NULL
+        return _StageTimer(self, name)
+
+    def timed(self, name):
+        """Decorator form of stage(); while disabled the wrapper only adds one flag check."""
+        def decorate(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _StageTimer(self, name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def trace(self, name='prediction'):
+        """Group the stages run inside it into one per-prediction record sent to every sink."""
+        if not self.enabled:
+            return _NULL
+        return _Trace(self, name)
+
+    def annotate(self, **fields):
+        # attach extra fields (label, feature vector, ...) to the current trace, if any
+        trace = getattr(self._local, 'trace', None)
+        if trace is not None:
+            trace.record.update(fields)
+
+    def count(self, name, n=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def observe(self, name, seconds, trace=True):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+        current = getattr(self._local, 'trace', None) if trace else None
+        if current is not None:
+            stages = current.record['stages']
+            stages[name] = stages.get(name, 0.0) + seconds
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        return sink
+
+    def emit(self, record):
+        for sink in self.sinks:
+            sink.write(record)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': dict(self.counters),
+                'stages': {name: h.summary() for name, h in self.histograms.items()}
+            }
+
+    def summary_line(self, stages=('load', 'filter', 'features', 'classify', 'total')):
+        """One-line latency panel text: last and p99 milliseconds per stage."""
+        parts = []
+        for name, s in self.snapshot()['stages'].items():
+            if name in stages and s['count']:
+                parts.append(f"{name} {s['last'] * 1e3:.1f}ms (p99 {s['p99'] * 1e3:.1f})")
+        return " | ".join(parts) if parts else "No timings yet"
+
+    def prometheus_text(self, prefix='eog'):
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"# TYPE {prefix}_{name}_total counter")
+                lines.append(f"{prefix}_{name}_total {value}")
+            if self.histograms:
+                lines.append(f"# TYPE {prefix}_stage_seconds histogram")
+            for name, h in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, n in zip(h.buckets, h.counts):
+                    cumulative += n
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f'{prefix}_stage_seconds_bucket{{stage="{name}",le="{le}"}} {cumulative}')
+                lines.append(f'{prefix}_stage_seconds_sum{{stage="{name}"}} {h.total}')
+                lines.append(f'{prefix}_stage_seconds_count{{stage="{name}"}} {h.count}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+
+class RingBufferSink:
+    """Keeps the last `size` trace records in memory."""
+
+    def __init__(self, size=256):
+        self.records = deque(maxlen=size)
+
+    def write(self, record):
+        self.records.append(record)
+
+
+class JsonLinesSink:
+    """Appends one JSON object per trace record to a file."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def write(self, record):
+        line = json.dumps(record, default=_json_default)
+        with self._lock, open(self.path, 'a') as f:
+            f.write(line + "\n")
+
+
+def _json_default(value):
+    # numpy scalars and arrays in feature vectors
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    return str(value)
+
+
+class PrometheusSink:
+    """Serves metrics.prometheus_text() at http://host:port/metrics from a daemon thread."""
+
+    def __init__(self, metrics, port=9100, host='127.0.0.1'):
+        # imported here so importing instrumentation (and handlingfunctions) does not load http.server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.rstrip('/') not in ('', '/metrics'):
+                    handler.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode()
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; version=0.0.4')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.port = self.server.server_address[1]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def write(self, record):
+        pass  # metrics are pulled from the histograms, not pushed per record
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+metrics = Instrumentation()
+recent_traces = None  # RingBufferSink once configure_from_env() enabled metrics
+
+
+def configure_from_env():
+    """Enable metrics and sinks from EOG_METRICS* variables; safe to call more than once."""
+    global recent_traces
+    if recent_traces is not None or os.environ.get('EOG_METRICS', '') in ('', '0'):
+        return metrics
+    metrics.enabled = True
+    recent_traces = metrics.add_sink(RingBufferSink())
+    if os.environ.get('EOG_METRICS_JSONL'):
+        metrics.add_sink(JsonLinesSink(os.environ['EOG_METRICS_JSONL']))
+    if os.environ.get('EOG_METRICS_PORT'):
+        metrics.add_sink(PrometheusSink(metrics, int(os.environ['EOG_METRICS_PORT'])))
+    return metrics
@@ -1,54 +1,47 @@
 import tkinter as tk
 from tkinter import messagebox, filedialog
-import numpy as np
-import joblib
-from scipy.signal import butter, filtfilt, find_peaks
-from scipy import signal
-import pandas as pd
 import sys
+import queue
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from tkinter import ttk
+import calculator_state
 import handlingfunctions as hd
-# === EOG Classifier Configuration ===
-MODEL_PATH = "Morphological Feature model.joblib"
-SAMPLE_RATE = 176  # Matches test script
-LOW_CUTOFF = 0.5
-HIGH_CUTOFF = 20
-ORDER = 2
-
-label_map = {
-    0: 'up',
-    1: 'down',
-    2: 'right',
-    3: 'left',
-    4: 'blink'
-}
-
-try:
-    model = joblib.load(MODEL_PATH)
-except FileNotFoundError:
-    messagebox.showerror("Error", f"Model file '{MODEL_PATH}' not found. Please ensure the model file is in the correct location.")
-    sys.exit(1)
+import instrumentation
+import session_replay
+# === EOG Classifier Configuration (shared with handlingfunctions) ===
+MODEL_PATH = hd.MODEL_PATH
+SAMPLE_RATE = hd.SAMPLE_RATE
+LOW_CUTOFF = hd.LOW_CUTOFF
+HIGH_CUTOFF = hd.HIGH_CUTOFF
+ORDER = hd.ORDER
+
+label_map = hd.label_map
 
 def load_and_process_file(filepath):
-    with open(filepath, 'r') as f:
-        raw = f.read().strip().replace('\n', ',')
-    signal = np.array([float(x) for x in raw.split(',') if x.strip()])
+    signal = hd.load_signal(filepath)
     return hd.butter_bandpass_filter(signal, LOW_CUTOFF, HIGH_CUTOFF, SAMPLE_RATE, ORDER)
 
 class EOGCalculatorUI:
     def __init__(self, root):
         self.root = root
         self.root.title("EOG Calculator")
-        self.expression = ""
-        self.selector_pos = (4, 4)
+        # expression, selector and history live in the headless calculator, this class only renders it
+        self.calc = calculator_state.Calculator()
+        self.recorder = session_replay.recorder_from_env('tk')
         self.buttons_map = {}
-        self.processing = False
-        self.movement_history = []
-        self.max_history = 5  # Keep last 5 movements
+        self.default_colors = {}
+        # prediction work runs on a single worker thread, results come back through root.after
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.pending_samples = deque()
+        self.results = queue.Queue()
+        self.active_job = None  # (files, cancel_event) of the sample being processed
         
         # Movement history display
         self.history_var = tk.StringVar(value="Movement History: ")
         self.history_label = None
+        self.latency_label = None
         self.setup_ui()
 
     def setup_ui(self):
@@ -70,6 +63,12 @@ class EOGCalculatorUI:
                                    fg="#ffffff", bg='#2c3e50', pady=10)
         self.status_label.grid(row=8, column=0, columnspan=3, sticky="w", padx=20)
 
+        # live per-stage latency panel, only when EOG_METRICS is set
+        if instrumentation.configure_from_env().enabled:
+            self.latency_label = tk.Label(self.root, text=instrumentation.metrics.summary_line(),
+                                        font=("Helvetica", 10), fg="#bdc3c7", bg='#2c3e50')
+            self.latency_label.grid(row=10, column=0, columnspan=9, sticky="w", padx=20, pady=(0, 10))
+
         # Display with dark theme
         self.display = tk.Entry(self.root, font=("Helvetica", 28), bd=0,
                               relief=tk.FLAT, justify='right',
@@ -100,18 +99,21 @@ class EOGCalculatorUI:
         sample_btn.bind('<Enter>', lambda e: e.widget.configure(bg='#27ae60'))
         sample_btn.bind('<Leave>', lambda e: e.widget.configure(bg='#2ecc71'))
 
+        cancel_btn = tk.Button(self.root, text="Cancel",
+                             font=("Helvetica", 14, "bold"),
+                             bg="#e67e22", fg="white",
+                             relief=tk.FLAT,
+                             command=self.cancel_processing)
+        cancel_btn.grid(row=8, column=6, columnspan=3,
+                       sticky="nsew", padx=20, pady=(0, 20))
+        cancel_btn.bind('<Enter>', lambda e: e.widget.configure(bg='#d35400'))
+        cancel_btn.bind('<Leave>', lambda e: e.widget.configure(bg='#e67e22'))
+
         self.update_selector()
 
     def layout_buttons(self, parent):
-        button_layout = {
-            '.': (4, 4), 'C': (1, 4), 'E': (2, 5),
-            '8': (2, 3), '9': (2, 4),
-            '1': (3, 2), '2': (4, 2), '3': (5, 2), '0': (4, 1),
-            '4': (3, 6), '5': (4, 6), '6': (5, 6), '7': (4, 7),
-            '/': (6, 3), '+': (6, 4), '-': (6, 5), '*': (7, 4)
-        }
-
-        for val, (r, c) in button_layout.items():
+        # keypad cell (r, c) goes to (r + 1, c + 1) of the 9x9 frame, leaving a margin around it
+        for (r, c), val in self.calc.keypad.buttons.items():
             bg_color = {
                 'E': '#e74c3c',
                 'C': '#f39c12',
@@ -127,10 +129,10 @@ class EOGCalculatorUI:
                           bg=bg_color, fg='#2c3e50',
                           relief=tk.FLAT,
                           state='disabled')
-            
-            btn._command = lambda v=val: self.on_click(v)
-            btn.grid(row=r, column=c, padx=5, pady=5)
+
+            btn.grid(row=r + 1, column=c + 1, padx=5, pady=5)
             self.buttons_map[(r, c)] = btn
+            self.default_colors[(r, c)] = bg_color
             
             self.setup_button_hover(btn, val, r, c)
 
@@ -142,7 +144,7 @@ class EOGCalculatorUI:
             else: e.widget.configure(bg='#7f8c8d')
 
         def on_leave(e):
-            if (r, c) == self.selector_pos:
+            if (r, c) == self.calc.position:
                 e.widget.configure(bg='#3498db')
             else:
                 if val == 'E': e.widget.configure(bg='#e74c3c')
@@ -153,114 +155,47 @@ class EOGCalculatorUI:
         btn.bind('<Enter>', on_enter)
         btn.bind('<Leave>', on_leave)
 
-    def update_selector(self):
-        for pos, btn in self.buttons_map.items():
-            btn.config(bg='#3498db' if pos == self.selector_pos else self.get_default_color(btn.cget('text')))
-
-    def get_default_color(self, val):
-        return {
-            'E': '#e74c3c',
-            'C': '#f39c12',
-            '+': '#7f8c8d',
-            '-': '#7f8c8d',
-            '*': '#7f8c8d',
-            '/': '#7f8c8d'
-        }.get(val, '#95a5a6')
-
-    def update_movement_history(self, movement):
-        """Update movement history and display"""
-        # If movement is blink, add the automatic center movement
-        if movement == "blink":
-            self.movement_history.append("blink → center")
-        else:
-            self.movement_history.append(movement)
-            
-        if len(self.movement_history) > self.max_history:
-            self.movement_history.pop(0)
-        
-        history_text = "Movement History: " + " → ".join(self.movement_history)
-        self.history_var.set(history_text)
-
-    def move_selector(self, direction):
-        r, c = self.selector_pos
-        positions = list(self.buttons_map.keys())
-        
-        # Find valid positions in the requested direction
-        valid_positions = []
-        if direction == "up":
-            # First try direct up
-            valid_positions = [(row, col) for (row, col) in positions if row < r and col == c]
-            # If no direct up position, try diagonal
-            if not valid_positions:
-                valid_positions = [(row, col) for (row, col) in positions if row < r and abs(col - c) <= 1]
-        elif direction == "down":
-            # First try direct down
-            valid_positions = [(row, col) for (row, col) in positions if row > r and col == c]
-            # If no direct down position, try diagonal
-            if not valid_positions:
-                valid_positions = [(row, col) for (row, col) in positions if row > r and abs(col - c) <= 1]
-        elif direction == "left":
-            # First try direct left
-            valid_positions = [(row, col) for (row, col) in positions if col < c and row == r]
-            # If no direct left position, try diagonal
-            if not valid_positions:
-                valid_positions = [(row, col) for (row, col) in positions if col < c and abs(row - r) <= 1]
-        elif direction == "right":
-            # First try direct right
-            valid_positions = [(row, col) for (row, col) in positions if col > c and row == r]
-            # If no direct right position, try diagonal
-            if not valid_positions:
-                valid_positions = [(row, col) for (row, col) in positions if col > c and abs(row - r) <= 1]
-        
-        if valid_positions:
-            # Find the nearest position
-            if direction in ["up", "down"]:
-                new_pos = min(valid_positions, key=lambda pos: abs(pos[0] - r))
-            else:  # left or right
-                new_pos = min(valid_positions, key=lambda pos: abs(pos[1] - c))
-            
-            self.selector_pos = new_pos
-            self.update_selector()
-            self.update_status(f"Moved {direction}", "blue")
-            self.update_movement_history(direction)
-        else:
-            self.update_status(f"Cannot move {direction}", "orange")
-
-    def trigger_selection(self):
-        if self.selector_pos in self.buttons_map:
-            btn = self.buttons_map[self.selector_pos]
-            if hasattr(btn, '_command'):
-                btn._command()
-            # Update history with blink (which includes centering)
-            self.update_movement_history("blink")
-            # Return to center
-            self.selector_pos = (4, 4)
-            self.update_selector()
-
-    def on_click(self, char):
-        if char == "C":
-            self.expression = ""
-            self.display.delete(0, tk.END)
-        elif char == "E":
+    def update_selector(self, previous_pos=None):
+        # repaint only the buttons whose state changed once the initial paint is done
+        if previous_pos is None:
+            for pos, btn in self.buttons_map.items():
+                btn.config(bg='#3498db' if pos == self.calc.position else self.default_colors[pos])
+            return
+        if previous_pos == self.calc.position:
+            return
+        if previous_pos in self.buttons_map:
+            self.buttons_map[previous_pos].config(bg=self.default_colors[previous_pos])
+        if self.calc.position in self.buttons_map:
+            self.buttons_map[self.calc.position].config(bg='#3498db')
+
+    def render(self, previous_pos=None):
+        """Bring the widgets in line with self.calc after a gesture"""
+        self.update_selector(previous_pos)
+        self.display.delete(0, tk.END)
+        self.display.insert(tk.END, self.calc.display)
+        history = ["blink → center" if g == "blink" else g for g in self.calc.history]
+        self.history_var.set("Movement History: " + " → ".join(history))
+        if self.calc.error:
+            messagebox.showerror("Error", self.calc.error)
+        if self.calc.quit:
             self.root.quit()
+
+    def apply_gesture(self, label):
+        previous_pos = self.calc.position
+        action, value = self.calc.apply(label)
+        if self.recorder is not None:
+            self.recorder.record(label, self.calc)
+        if action == 'moved':
+            self.update_status(f"Moved {value}", "blue")
+        elif action == 'blocked':
+            self.update_status(f"Cannot move {value}", "orange")
         else:
-            self.expression += str(char)
-            
-            self.display.delete(0, tk.END)
-            self.display.insert(tk.END, self.expression)
-            
-            if len(self.expression) >= 3:
-                last_three = self.expression[-3:]
-                if (last_three[0].isdigit() and 
-                    last_three[1] in ['+', '-', '*', '/'] and 
-                    last_three[2].isdigit()):
-                    try:
-                        result = str(eval(self.expression))
-                        self.display.delete(0, tk.END)
-                        self.display.insert(tk.END, result)
-                        self.expression = result
-                    except:
-                        messagebox.showerror("Error", "Invalid Expression")
+            self.update_status(f"Predicted: {label}", "green")
+        self.render(previous_pos)
+
+    def on_stream_gesture(self, event):
+        """on_gesture callback for streaming.StreamingClassifier, safe to call from a reader thread"""
+        self.root.after(0, self.apply_gesture, event.label)
 
     def update_status(self, message, color="white"):
         colors = {
@@ -271,53 +206,90 @@ class EOGCalculatorUI:
             "white": "#ffffff"
         }
         self.status_label.config(text=message, fg=colors.get(color, "#ffffff"))
-        self.root.update()
 
     def run_prediction_pipeline(self):
-        if self.processing:
-            self.update_status("Already processing a sample...", "orange")
+        self.update_status("Select horizontal and vertical signal files...", "blue")
+
+        files = filedialog.askopenfilenames(
+            title="Select Both Signal Files",
+            filetypes=[("Text files", "*.txt")],
+            multiple=True
+        )
+
+        if not files or len(files) != 2:
+            message = "Please select exactly two signal files (horizontal and vertical)"
+            self.update_status(f"Error: {message}", "red")
+            messagebox.showerror("Error", message)
             return
 
-        try:
-            self.processing = True
-            self.update_status("Select horizontal and vertical signal files...", "blue")
-            
-            files = filedialog.askopenfilenames(
-                title="Select Both Signal Files",
-                filetypes=[("Text files", "*.txt")],
-                multiple=True
-            )
-            
-            if not files or len(files) != 2:
-                raise ValueError("Please select exactly two signal files (horizontal and vertical)")
-
-            h_signal = hd.validate_signal_file(files[0])
-            v_signal = hd.validate_signal_file(files[1])
+        self.pending_samples.append(tuple(files))
+        if self.active_job is None:
+            self.start_next_sample()
+        else:
+            self.update_status(f"Queued sample ({len(self.pending_samples)} waiting)", "blue")
 
-            h_filtered = hd.butter_bandpass_filter(h_signal, LOW_CUTOFF, HIGH_CUTOFF, SAMPLE_RATE, ORDER)
-            v_filtered = hd.butter_bandpass_filter(v_signal, LOW_CUTOFF, HIGH_CUTOFF, SAMPLE_RATE, ORDER)
+    def start_next_sample(self):
+        if not self.pending_samples:
+            self.active_job = None
+            return
 
-            h_features = hd.extract_morphological_features(h_filtered.reshape(1, -1))
-            v_features = hd.extract_morphological_features(v_filtered.reshape(1, -1))
+        files = self.pending_samples.popleft()
+        cancel_event = threading.Event()
+        self.active_job = (files, cancel_event)
+        waiting = f" ({len(self.pending_samples)} waiting)" if self.pending_samples else ""
+        self.update_status(f"Processing sample...{waiting}", "blue")
 
-            selected_features = hd.features_selection(h_features,v_features)
+        future = self.executor.submit(self.process_sample, files, cancel_event)
+        future.add_done_callback(lambda f: self.results.put((cancel_event, f)))
+        self.root.after(20, self.poll_results)
 
-            label = hd.prediction(selected_features)
+    @staticmethod
+    def process_sample(files, cancel_event):
+        """Worker-thread part of the pipeline, returns the label or None when cancelled"""
+        with instrumentation.metrics.trace('tk_sample'):
+            instrumentation.metrics.annotate(files=list(files))
+            return EOGCalculatorUI._run_pipeline(files, cancel_event)
 
-            self.update_status(f"Predicted: {label}", "green")
+    @staticmethod
+    def _run_pipeline(files, cancel_event):
+        return hd.predict_files(files[0], files[1], cancel_event=cancel_event)
 
-            if label == "blink":
-                self.trigger_selection()
-            else:
-                self.move_selector(label)
+    def poll_results(self):
+        try:
+            cancel_event, future = self.results.get_nowait()
+        except queue.Empty:
+            self.root.after(20, self.poll_results)
+            return
 
-        except Exception as e:
-            self.update_status(f"Error: {str(e)}", "red")
-            messagebox.showerror("Error", str(e))
-        finally:
-            self.processing = False
+        if not cancel_event.is_set():
+            try:
+                label = future.result()
+                if label is not None:
+                    self.apply_gesture(label)
+            except Exception as e:
+                self.update_status(f"Error: {str(e)}", "red")
+                messagebox.showerror("Error", str(e))
+
+        if self.latency_label is not None:
+            self.latency_label.config(text=instrumentation.metrics.summary_line())
+        self.start_next_sample()
+
+    def cancel_processing(self):
+        dropped = len(self.pending_samples)
+        self.pending_samples.clear()
+        if self.active_job is not None:
+            self.active_job[1].set()
+            dropped += 1
+        self.update_status(f"Cancelled {dropped} sample(s)" if dropped else "Nothing to cancel", "orange")
 
 if __name__ == "__main__":
+    # load the model before the window opens so a missing file is reported up front
+    try:
+        hd.get_model()
+    except FileNotFoundError:
+        messagebox.showerror("Error", f"Model file '{MODEL_PATH}' not found. Please ensure the model file is in the correct location.")
+        sys.exit(1)
+
     root = tk.Tk()
     app = EOGCalculatorUI(root)
     root.mainloop()
@@ -0,0 +1,46 @@
+DIRECTIONS = ('up', 'down', 'left', 'right')
+
+# (row step, column step) for each gaze direction
+STEPS = {
+    'up': (-1, 0),
+    'down': (1, 0),
+    'left': (0, -1),
+    'right': (0, 1)
+}
+
+
+# Navigation tables map position -> {direction: next position}; a direction missing from a
+# position's entry means the selector cannot move that way. Building the table once turns every
+# gaze movement into a single dict lookup.
+
+def _nearest(positions, pos, direction):
+    # nearest button in the direction, trying the same row/column first and then the neighbouring ones
+    r, c = pos
+    dr, dc = STEPS[direction]
+    if dr:
+        ahead = [(row, col) for (row, col) in positions if (row - r) * dr > 0]
+        candidates = [p for p in ahead if p[1] == c] or [p for p in ahead if abs(p[1] - c) <= 1]
+        key = lambda p: abs(p[0] - r)
+    else:
+        ahead = [(row, col) for (row, col) in positions if (col - c) * dc > 0]
+        candidates = [p for p in ahead if p[0] == r] or [p for p in ahead if abs(p[0] - r) <= 1]
+        key = lambda p: abs(p[1] - c)
+    return min(candidates, key=key) if candidates else None
+
+
+def compile_nearest_navigation(positions):
+    """Table for a sparse button layout (the calculator keypad), diagonal fallbacks resolved ahead of time."""
+    positions = list(positions)
+    table = {}
+    for pos in positions:
+        table[pos] = {}
+        for direction in DIRECTIONS:
+            target = _nearest(positions, pos, direction)
+            if target is not None:
+                table[pos][direction] = target
+    return table
+
+
+def move(table, pos, direction):
+    """Next position, or None when the move is not possible."""
+    return table.get(pos, {}).get(direction)
@@ -0,0 +1,250 @@
+# Binary format for long continuous H/V recordings, opened with np.memmap so windows are views into the
+# file and memory stays flat whatever the recording length.
+# Layout: 64-byte little-endian header (magic, version, channels, dtype, sample rate, scale, offset,
+# n_samples) followed by interleaved samples, physical value = stored * scale + offset.
+# Usage: python recording.py convert H.txt V.txt out.eog [--dtype int16]
+#        python recording.py info out.eog
+import argparse
+import os
+import struct
+
+import numpy as np
+
+import handlingfunctions as hd
+
+MAGIC = b'EOGR'
+VERSION = 1
+HEADER = struct.Struct('<4sHH8sdddQ16x')
+DTYPES = {'int16': '<i2', 'float32': '<f4'}
+CHANNELS = ('h', 'v')
+
+
+def _dtype_name(dtype):
+    for name, code in DTYPES.items():
+        if np.dtype(code) == np.dtype(dtype):
+            return name
+    raise ValueError(f"Unsupported sample dtype {dtype}, use one of {sorted(DTYPES)}")
+
+
+def int16_scaling(*signals):
+    """(scale, offset) mapping the signals' range onto int16; integer-valued signals are stored losslessly."""
+    values = np.concatenate([np.asarray(s, dtype=float).ravel() for s in signals])
+    if values.size == 0:
+        return 1.0, 0.0
+    low, high = float(values.min()), float(values.max())
+    if np.all(values == np.round(values)) and high - low <= 65535:
+        # integer ADC counts: keep them exact, only shift into the int16 range when needed
+        offset = 0.0 if low >= -32768 and high <= 32767 else float(np.floor((low + high) / 2))
+        return 1.0, offset
+    offset = (low + high) / 2
+    return max((high - low) / 65534, np.finfo(float).tiny), offset
+
+
+class RecordingWriter:
+    """Appends H/V chunks to a recording file; the sample count in the header is updated on close()."""
+
+    def __init__(self, path, sample_rate=hd.SAMPLE_RATE, dtype='float32', scale=1.0, offset=0.0):
+        self.path = path
+        self.sample_rate = float(sample_rate)
+        self.dtype = np.dtype(DTYPES[_dtype_name(dtype)])
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.n_samples = 0
+        self._file = open(path, 'wb')
+        self._write_header()
+
+    def _write_header(self):
+        self._file.seek(0)
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(CHANNELS), self.dtype.str.encode(), self.sample_rate,
+                                     self.scale, self.offset, self.n_samples))
+
+    def append(self, h_chunk, v_chunk):
+        h_chunk = np.asarray(h_chunk, dtype=float)
+        v_chunk = np.asarray(v_chunk, dtype=float)
+        if h_chunk.shape != v_chunk.shape or h_chunk.ndim != 1:
+            raise ValueError("H and V chunks must be 1-D and of the same length")
+        frame = (np.column_stack([h_chunk, v_chunk]) - self.offset) / self.scale
+        if self.dtype.kind == 'i':
+            info = np.iinfo(self.dtype)
+            frame = np.clip(np.round(frame), info.min, info.max)
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(frame.astype(self.dtype).tobytes())
+        self.n_samples += len(h_chunk)
+
+    def close(self):
+        if not self._file.closed:
+            self._write_header()
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def write_recording(path, h_signal, v_signal, sample_rate=hd.SAMPLE_RATE, dtype='float32'):
+    scale, offset = int16_scaling(h_signal, v_signal) if _dtype_name(dtype) == 'int16' else (1.0, 0.0)
+    with RecordingWriter(path, sample_rate, dtype, scale, offset) as writer:
+        writer.append(h_signal, v_signal)
+    return path
+
+
+class Recording:
+    """
+    A memory-mapped recording. `data` is the raw (n_samples, channels) map, `h` and `v` are strided column
+    views of it. window()/windows() give physical values: views for float32 files stored with scale 1 and
+    offset 0, otherwise converted copies of only the requested window(s).
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is too short to be a recording")
+        magic, version, channels, dtype, sample_rate, scale, offset, n_samples = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an EOG recording")
+        if version != VERSION:
+            raise ValueError(f"Unsupported recording version {version}")
+        self.path = path
+        self.channels = channels
+        self.dtype = np.dtype(dtype.rstrip(b'\0').decode())
+        self.sample_rate = sample_rate
+        self.scale = scale
+        self.offset = offset
+        self.n_samples = n_samples
+
+        expected = HEADER.size + n_samples * channels * self.dtype.itemsize
+        if os.path.getsize(path) < expected:
+            raise ValueError(f"{path} is truncated: header says {n_samples} samples")
+        if n_samples:
+            self.data = np.memmap(path, dtype=self.dtype, mode='r', offset=HEADER.size, shape=(n_samples, channels))
+        else:
+            self.data = np.empty((0, channels), dtype=self.dtype)
+        self.h = self.data[:, 0]
+        self.v = self.data[:, 1]
+
+    def __len__(self):
+        return self.n_samples
+
+    @property
+    def duration(self):
+        return self.n_samples / self.sample_rate
+
+    @property
+    def zero_copy(self):
+        return self.dtype.kind == 'f' and self.scale == 1.0 and self.offset == 0.0
+
+    def physical(self, raw):
+        if self.zero_copy:
+            return raw
+        return raw * self.scale + self.offset
+
+    def window(self, start, length):
+        """(h, v) samples [start, start + length)."""
+        if start < 0 or start + length > self.n_samples:
+            raise ValueError(f"Window [{start}, {start + length}) outside recording of {self.n_samples} samples")
+        return self.physical(self.h[start:start + length]), self.physical(self.v[start:start + length])
+
+    def windows(self, length, step, start=0, stop=None):
+        """
+        (starts, h, v) with h and v of shape (n_windows, length): sliding-window views over the map, so
+        no samples are copied for zero-copy files.
+        """
+        stop = self.n_samples if stop is None else min(stop, self.n_samples)
+        if stop - start < length:
+            return np.empty(0, dtype=np.int64), np.empty((0, length)), np.empty((0, length))
+        view = np.lib.stride_tricks.sliding_window_view
+        h = view(self.h[start:stop], length)[::step]
+        v = view(self.v[start:stop], length)[::step]
+        starts = start + np.arange(len(h), dtype=np.int64) * step
+        return starts, self.physical(h), self.physical(v)
+
+    def iter_windows(self, length, step, batch=256):
+        """windows() in blocks of at most `batch` windows, bounding the memory of any per-block copies."""
+        span = (batch - 1) * step + length
+        start = 0
+        while start + length <= self.n_samples:
+            starts, h, v = self.windows(length, step, start, start + span)
+            yield starts, h, v
+            start += batch * step
+
+    def close(self):
+        mmap = getattr(self.data, '_mmap', None)
+        self.data = self.h = self.v = None
+        if mmap is not None:
+            mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def open_recording(path):
+    return Recording(path)
+
+
+def window_features(recording, length=251, step=None, batch=256):
+    """
+    Generator of (starts, h_features, v_features) for sliding windows over a recording, using the
+    band-pass and morphological feature stages of handlingfunctions one block of windows at a time.
+    Only `batch` filtered windows are held in memory at once.
+    """
+    step = step or length
+    for starts, h, v in recording.iter_windows(length, step, batch):
+        h_filtered = hd.butter_bandpass_filter(h, hd.LOW_CUTOFF, hd.HIGH_CUTOFF, recording.sample_rate, hd.ORDER)
+        v_filtered = hd.butter_bandpass_filter(v, hd.LOW_CUTOFF, hd.HIGH_CUTOFF, recording.sample_rate, hd.ORDER)
+        yield (starts, hd.extract_morphological_features(h_filtered, selected_only=True),
+               hd.extract_morphological_features(v_filtered, selected_only=True))
+
+
+def filter_recording(recording, output, block_size=65536):
+    """Band-pass a whole recording into a new float32 recording, block by block (see hd.chunked_bandpass_filter)."""
+    def blocks():
+        for start in range(0, recording.n_samples, block_size):
+            yield recording.physical(recording.data[start:start + block_size].T)
+
+    with RecordingWriter(output, recording.sample_rate, 'float32') as writer:
+        for h, v in hd.chunked_bandpass_filter(blocks(), sampling_rate=recording.sample_rate, block_size=block_size):
+            writer.append(h, v)
+    return output
+
+
+def convert(h_source, v_source, output, dtype='int16', sample_rate=hd.SAMPLE_RATE):
+    """Convert a pair of .txt/.csv/.xlsx signal files to one recording file."""
+    h_signal = hd.load_signal(h_source)
+    v_signal = hd.load_signal(v_source)
+    if len(h_signal) != len(v_signal):
+        raise ValueError(f"H and V have different lengths ({len(h_signal)} and {len(v_signal)})")
+    return write_recording(output, h_signal, v_signal, sample_rate, dtype)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert and inspect binary EOG recordings")
+    commands = parser.add_subparsers(dest='command', required=True)
+    to_binary = commands.add_parser('convert', help="convert H/V text files to a recording")
+    to_binary.add_argument('horizontal')
+    to_binary.add_argument('vertical')
+    to_binary.add_argument('output')
+    to_binary.add_argument('--dtype', choices=sorted(DTYPES), default='int16')
+    to_binary.add_argument('--sample-rate', type=float, default=hd.SAMPLE_RATE)
+    info = commands.add_parser('info', help="print a recording's header")
+    info.add_argument('path')
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert(args.horizontal, args.vertical, args.output, args.dtype, args.sample_rate)
+        print(f"wrote {args.output} ({os.path.getsize(args.output)} bytes)")
+    else:
+        with open_recording(args.path) as rec:
+            print(f"{args.path}: {rec.n_samples} samples x {rec.channels} channels, {_dtype_name(rec.dtype)}, "
+                  f"{rec.sample_rate:g} Hz ({rec.duration:.1f}s), scale {rec.scale:g}, offset {rec.offset:g}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,191 @@
+# Offline gesture segmentation for continuous H/V recordings: one linear pass of chunked zero-phase
+# band-pass filtering and energy/derivative onset detection, then every detected event is cut out as a
+# window aligned like the class/ trials (onset PRE_ONSET samples in) and classified in bulk.
+# Usage: python segmenter.py recording.eog [--json]
+#        python segmenter.py H.txt V.txt [--json]
+import argparse
+import json
+from collections import namedtuple
+
+import numpy as np
+from scipy.signal import lfilter
+
+import handlingfunctions as hd
+import recording
+from streaming import BASELINE_SECONDS, PRE_ONSET, WINDOW_SIZE
+
+THRESHOLD = 3.0  # onset when activity > baseline mean + THRESHOLD * baseline std
+DERIVATIVE_WEIGHT = 0.0  # activity = |filtered| + DERIVATIVE_WEIGHT * |d filtered / d sample|; 0 scored best on class/Test sessions
+BLOCK_SIZE = 8192  # samples filtered per block, bounds memory independently of recording length
+BATCH = 256  # windows per classify_batch call
+
+# start/end are the sample indices of the detected activity; the classified window starts
+# PRE_ONSET samples before start and is WINDOW_SIZE long
+Segment = namedtuple('Segment', ['start', 'end', 'label', 'confidence'])
+
+
+def _confidence(scores):
+    # softmax of the one-vs-rest decision values, probability-like in (0, 1]
+    shifted = np.exp(scores - scores.max(axis=1, keepdims=True))
+    return shifted.max(axis=1) / shifted.sum(axis=1)
+
+
+class _Detector:
+    """Onset/offset detection over consecutive filtered blocks, state carried between blocks."""
+
+    def __init__(self, sample_rate, threshold, window_size, pre_onset, refractory, baseline_seconds):
+        self.threshold = threshold
+        self.span = window_size - pre_onset  # activity after the onset that still belongs to the event
+        self.hold = window_size + refractory - pre_onset  # no new onset this long after one
+        self.alpha = 1.0 / (baseline_seconds * sample_rate)
+        self.warmup = max(int(baseline_seconds * sample_rate), pre_onset)
+        self.stats_zi = None
+        self.previous = None
+        self.blocked_until = self.warmup
+        self.pending = None  # [onset, last active sample] of the event still open
+        self.events = []
+
+    def activity(self, filtered):
+        step = np.diff(filtered, axis=1, prepend=filtered[:, :1] if self.previous is None else self.previous)
+        self.previous = filtered[:, -1:]
+        return np.hypot(filtered[0], filtered[1]) + DERIVATIVE_WEIGHT * np.hypot(step[0], step[1])
+
+    def push(self, filtered, n0):
+        activity = self.activity(filtered)
+        moments = np.stack([activity, activity * activity])
+        if self.stats_zi is None:
+            self.stats_zi = moments[:, :1] * (1.0 - self.alpha)
+        # each sample is compared with the baseline before it was included
+        before = self.stats_zi / (1.0 - self.alpha)
+        smoothed, self.stats_zi = lfilter([self.alpha], [1.0, self.alpha - 1.0], moments, axis=1, zi=self.stats_zi)
+        baseline = np.concatenate([before, smoothed[:, :-1]], axis=1)
+        std = np.sqrt(np.maximum(baseline[1] - baseline[0] ** 2, 0.0))
+        active = np.flatnonzero(activity > baseline[0] + self.threshold * std) + n0
+
+        # each active sample is visited once: either it extends the open event or it may start a new one
+        i = 0
+        while i < len(active):
+            if self.pending is not None:
+                limit = self.pending[0] + self.span
+                j = np.searchsorted(active, limit, side='left')
+                if j > i:
+                    self.pending[1] = active[j - 1]
+                if j == len(active) and limit > n0 + filtered.shape[1]:
+                    return  # the event may continue in the next block
+                self.events.append(tuple(self.pending))
+                self.pending = None
+                i = j
+                continue
+            i += np.searchsorted(active[i:], self.blocked_until, side='left')
+            if i == len(active):
+                break
+            self.pending = [active[i], active[i]]
+            self.blocked_until = active[i] + self.hold
+            i += 1
+        if self.pending is not None and self.pending[0] + self.span <= n0 + filtered.shape[1]:
+            self.events.append(tuple(self.pending))
+            self.pending = None
+
+    def finish(self):
+        if self.pending is not None:
+            self.events.append(tuple(self.pending))
+            self.pending = None
+        return self.events
+
+
+def detect_events(blocks, sample_rate=hd.SAMPLE_RATE, threshold=THRESHOLD, window_size=WINDOW_SIZE,
+                  pre_onset=PRE_ONSET, refractory=None, baseline_seconds=BASELINE_SECONDS):
+    """[(onset, last active sample)] from an iterable of raw (2, n) H/V blocks, filtered chunk by chunk."""
+    detector = _Detector(sample_rate, threshold, window_size, pre_onset,
+                         window_size // 2 if refractory is None else refractory, baseline_seconds)
+    n0 = 0
+    for filtered in hd.chunked_bandpass_filter(blocks, sampling_rate=sample_rate, block_size=BLOCK_SIZE):
+        detector.push(filtered, n0)
+        n0 += filtered.shape[1]
+    return detector.finish()
+
+
+def classify_events(h, v, events, window_size=WINDOW_SIZE, pre_onset=PRE_ONSET, model_name='morphological',
+                    batch=BATCH):
+    """Segments for `events`, classifying windows cut from the raw h/v (arrays or memmap views) in bulk."""
+    n_samples = len(h)
+    if n_samples < window_size:
+        return []
+    segments = []
+    for b in range(0, len(events), batch):
+        chunk = events[b:b + batch]
+        # windows keep the training alignment, shifted inside the recording at its edges
+        starts = [min(max(onset - pre_onset, 0), n_samples - window_size) for onset, _ in chunk]
+        h_windows = np.stack([h[s:s + window_size] for s in starts])
+        v_windows = np.stack([v[s:s + window_size] for s in starts])
+        labels, scores = hd.classify_batch(h_windows, v_windows, model_name)
+        confidence = _confidence(np.asarray(scores, dtype=float))
+        for (onset, last), label, c in zip(chunk, labels, confidence):
+            segments.append(Segment(int(onset), int(last) + 1, label, float(c)))
+    return segments
+
+
+def segment_signals(h, v, sample_rate=hd.SAMPLE_RATE, threshold=THRESHOLD, model_name='morphological', **kwargs):
+    """Timeline of Segment(start, end, label, confidence) for in-memory H/V signals."""
+    h = np.asarray(h, dtype=float)
+    v = np.asarray(v, dtype=float)
+    if h.shape != v.shape or h.ndim != 1:
+        raise ValueError("H and V must be 1-D signals of the same length")
+    blocks = (np.stack([h[i:i + BLOCK_SIZE], v[i:i + BLOCK_SIZE]]) for i in range(0, len(h), BLOCK_SIZE))
+    events = detect_events(blocks, sample_rate, threshold, **kwargs)
+    return classify_events(h, v, events, kwargs.get('window_size', WINDOW_SIZE),
+                           kwargs.get('pre_onset', PRE_ONSET), model_name)
+
+
+def segment_recording(rec, threshold=THRESHOLD, model_name='morphological', **kwargs):
+    """segment_signals() for a memory-mapped recording.Recording, reading it block by block."""
+    blocks = (rec.physical(rec.data[i:i + BLOCK_SIZE].T) for i in range(0, rec.n_samples, BLOCK_SIZE))
+    events = detect_events(blocks, rec.sample_rate, threshold, **kwargs)
+    h = _PhysicalView(rec, rec.h)
+    v = _PhysicalView(rec, rec.v)
+    return classify_events(h, v, events, kwargs.get('window_size', WINDOW_SIZE),
+                           kwargs.get('pre_onset', PRE_ONSET), model_name)
+
+
+class _PhysicalView:
+    # slices of a recording channel converted to physical units, so windows are read on demand
+    def __init__(self, rec, column):
+        self.rec = rec
+        self.column = column
+
+    def __len__(self):
+        return len(self.column)
+
+    def __getitem__(self, index):
+        return self.rec.physical(self.column[index])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find and classify gestures in a continuous recording")
+    parser.add_argument('inputs', nargs='+', help="a .eog recording, or horizontal and vertical signal files")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD)
+    parser.add_argument('--model', default='morphological', choices=hd.model_registry.available())
+    parser.add_argument('--json', action='store_true', help="print the timeline as JSON")
+    args = parser.parse_args()
+
+    if len(args.inputs) == 1:
+        with recording.open_recording(args.inputs[0]) as rec:
+            sample_rate = rec.sample_rate
+            segments = segment_recording(rec, args.threshold, args.model)
+    elif len(args.inputs) == 2:
+        sample_rate = hd.SAMPLE_RATE
+        segments = segment_signals(hd.load_signal(args.inputs[0]), hd.load_signal(args.inputs[1]),
+                                   sample_rate, args.threshold, args.model)
+    else:
+        parser.error("expected one recording or an H and a V file")
+
+    if args.json:
+        print(json.dumps([s._asdict() for s in segments], indent=2))
+        return
+    for s in segments:
+        print(f"{s.start / sample_rate:9.2f}s - {s.end / sample_rate:9.2f}s  {s.label:6s} {s.confidence:.2f}")
+    print(f"{len(segments)} gestures")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# Session recording and headless replay of the calculator engine (calculator_state.py).
+# With EOG_SESSION_LOG=<path> the Tk and Streamlit frontends append every gesture, its timestamp and the
+# resulting state to a JSON lines log. Replaying a log (or a gesture script) drives the same state machine
+# at full speed, checks every recorded state plus the final expression and selector position, and
+# reports how many gestures per second the UI logic sustains. --verify also checks after every gesture
+# that the incremental result equals calculator_state.evaluate() of the whole expression.
+# Usage: python session_replay.py session.jsonl [--repeat 100]
+#        python session_replay.py --script "left blink right blink" [--expect-expression 2+]
+#        python session_replay.py --random 100000 [--seed 0] [--verify]
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+
+import calculator_state
+
+GESTURES = ('up', 'down', 'left', 'right', 'blink')
+
+
+class SessionRecorder:
+    """Appends one JSON object per gesture: {"t", "gesture", "state"}; the first line describes the session."""
+
+    def __init__(self, path, frontend):
+        self.path = path
+        self.frontend = frontend
+        self.start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._write({'session': frontend, 'started': time.strftime('%Y-%m-%dT%H:%M:%S')})
+
+    def _write(self, record):
+        with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def record(self, gesture, state):
+        self._write({'t': round(time.perf_counter() - self.start, 6), 'gesture': gesture,
+                     'state': state.snapshot()})
+
+
+def recorder_from_env(frontend, per_session=False):
+    """SessionRecorder for EOG_SESSION_LOG, or None; per_session adds a unique suffix (one file per user)."""
+    path = os.environ.get('EOG_SESSION_LOG')
+    if not path:
+        return None
+    if per_session:
+        base, ext = os.path.splitext(path)
+        path = f"{base}-{uuid.uuid4().hex[:8]}{ext or '.jsonl'}"
+    return SessionRecorder(path, frontend)
+
+
+def load_log(path):
+    """(frontend, [(gesture, recorded state)]) from a SessionRecorder log."""
+    frontend, steps = None, []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'session' in record:
+                if frontend is not None and steps:
+                    raise ValueError(f"{path} contains more than one session")
+                frontend = record['session']
+            else:
+                steps.append((record['gesture'], record['state']))
+    if frontend is None:
+        raise ValueError(f"{path} is not a session log")
+    return frontend, steps
+
+
+def parse_script(text):
+    gestures = text.replace(',', ' ').split()
+    unknown = sorted(set(gestures) - set(GESTURES))
+    if unknown:
+        raise ValueError(f"Unknown gestures in script: {', '.join(unknown)}")
+    return gestures
+
+
+def replay(gestures, expected=None, verify=False):
+    """
+    Run the gestures through a fresh Calculator. `expected` is an optional list of recorded snapshots
+    (one per gesture); returns (final snapshot, seconds, first mismatch or None).
+    """
+    calc = calculator_state.Calculator()
+    apply = calc.apply
+    mismatch = None
+    start = time.perf_counter()
+    if expected is None and not verify:
+        for gesture in gestures:
+            apply(gesture)
+        return calc.snapshot(), time.perf_counter() - start, None
+
+    for i, gesture in enumerate(gestures):
+        apply(gesture)
+        if mismatch is not None:
+            continue
+        if expected is not None:
+            snapshot = calc.snapshot()
+            if snapshot != expected[i]:
+                mismatch = {'step': i, 'gesture': gesture, 'recorded': expected[i], 'replayed': snapshot}
+        if verify:
+            try:
+                reference = calculator_state.evaluate(calc.expression)
+            except ZeroDivisionError:
+                reference = None
+            if calc.result != reference:
+                mismatch = {'step': i, 'gesture': gesture, 'expression': calc.expression,
+                            'result': str(calc.result), 'evaluate': str(reference)}
+    return calc.snapshot(), time.perf_counter() - start, mismatch
+
+
+def throughput(gestures, repeat=1):
+    """Best gestures per second over `repeat` full replays (no per-step checks)."""
+    best = min(replay(gestures)[1] for _ in range(max(1, repeat)))
+    return len(gestures) / best if best > 0 else float('inf')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay calculator sessions headlessly")
+    parser.add_argument('log', nargs='?', help="session log written with EOG_SESSION_LOG")
+    parser.add_argument('--script', help="gestures separated by spaces or commas, instead of a log")
+    parser.add_argument('--random', type=int, help="replay this many random gestures, instead of a log")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--verify', action='store_true', help="check the result against evaluate() every step")
+    parser.add_argument('--expect-expression', help="required final expression")
+    parser.add_argument('--expect-position', help="required final selector position as row,col")
+    parser.add_argument('--repeat', type=int, default=5, help="replays used for the throughput figure")
+    parser.add_argument('--json', action='store_true', help="print the report as JSON")
+    args = parser.parse_args()
+
+    expected = None
+    frontend = None
+    if args.log:
+        frontend, steps = load_log(args.log)
+        gestures = [g for g, _ in steps]
+        expected = [s for _, s in steps]
+    elif args.script:
+        gestures = parse_script(args.script)
+    elif args.random:
+        rng = random.Random(args.seed)
+        gestures = [rng.choice(GESTURES) for _ in range(args.random)]
+    else:
+        parser.error("give a session log, --script or --random")
+
+    final, _, mismatch = replay(gestures, expected, args.verify)
+    failures = []
+    if mismatch is not None:
+        step = mismatch.pop('step'), mismatch.pop('gesture')
+        failures.append(f"step {step[0]} ({step[1]}): {mismatch}")
+    if expected:
+        for key in ('expression', 'position'):
+            if final[key] != expected[-1][key]:
+                failures.append(f"final {key} {final[key]!r}, recorded {expected[-1][key]!r}")
+    if args.expect_expression is not None and final['expression'] != args.expect_expression:
+        failures.append(f"final expression {final['expression']!r}, expected {args.expect_expression!r}")
+    if args.expect_position is not None:
+        position = [int(x) for x in args.expect_position.split(',')]
+        if final['position'] != position:
+            failures.append(f"final position {final['position']}, expected {position}")
+
+    report = {
+        'frontend': frontend,
+        'gestures': len(gestures),
+        'final': final,
+        'gestures_per_second': throughput(gestures, args.repeat) if gestures else None,
+        'ok': not failures,
+        'failures': failures
+    }
+    if args.json:
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+    else:
+        print(f"{len(gestures)} gestures, final expression {final['expression']!r} = {final['result']!r}, "
+              f"position {final['position']}")
+        if report['gestures_per_second'] is not None:
+            print(f"{report['gestures_per_second']:,.0f} gestures/s")
+        for failure in failures:
+            print("FAIL " + failure)
+        print("OK" if report['ok'] else "MISMATCH")
+    sys.exit(0 if report['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
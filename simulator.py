@@ -0,0 +1,218 @@
+# Synthetic EOG device: replays the class/ recordings as an interleaved two-channel (H, V) sample stream,
+# in-process, over a pipe or over a TCP socket, and load-tests the streaming classifier with many
+# simulated users.
+# Usage: python simulator.py --users 8 --speed 20 --transport socket --jitter 0.002 --drop 0.001
+import argparse
+import glob
+import json
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+import handlingfunctions as hd
+import streaming
+
+CLASS_DIR = "class"
+REST_SAMPLES = 2 * hd.SAMPLE_RATE  # quiet period between replayed gestures
+CHUNK_SAMPLES = 8  # samples per packet, ~45 ms at 176 Hz
+SAMPLE_DTYPE = np.dtype('<f4')  # wire format: interleaved little-endian float32 H, V
+
+
+def load_recordings(root=CLASS_DIR, splits=('Train', 'Test')):
+    """(label, h, v) for every H/V pair under root/<split>/<Class>/."""
+    recordings = []
+    for split in splits:
+        for h_file in sorted(glob.glob(os.path.join(root, split, '*', '*h.txt'))):
+            v_file = h_file[:-len('h.txt')] + 'v.txt'
+            if not os.path.exists(v_file):
+                continue
+            label = os.path.basename(os.path.dirname(h_file)).lower()
+            recordings.append((label, hd.load_signal(h_file), hd.load_signal(v_file)))
+    return recordings
+
+
+def build_session(recordings, n_gestures=None, rest=REST_SAMPLES, seed=None):
+    """Concatenate shuffled trials with noisy rest periods, returns ((n, 2) samples, [(onset, label)])."""
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(recordings))
+    if n_gestures is not None:
+        order = np.resize(order, n_gestures)
+
+    parts, truth, pos = [], [], 0
+    for i in order:
+        label, h, v = recordings[i]
+        trial = np.column_stack([h, v])
+        quiet = trial[:1] + rng.normal(0.0, 0.5, size=(rest, 2))
+        parts.extend([quiet, trial])
+        truth.append((pos + rest, label))
+        pos += rest + len(trial)
+    parts.append(parts[-1][-1:] + rng.normal(0.0, 0.5, size=(rest, 2)))  # let the last window complete
+    return np.concatenate(parts), truth
+
+
+def sample_stream(session, speed=1.0, chunk=CHUNK_SAMPLES, jitter=0.0, drop=0.0, seed=None):
+    """
+    Yield (n, 2) chunks of the session paced at speed * SAMPLE_RATE (speed=0 means as fast as possible).
+    jitter is the std of a random per-chunk delay in seconds, drop the probability of losing each sample.
+    """
+    rng = np.random.default_rng(seed)
+    period = chunk / (hd.SAMPLE_RATE * speed) if speed > 0 else 0.0
+    start = time.perf_counter()
+    for k, i in enumerate(range(0, len(session), chunk)):
+        block = session[i:i + chunk]
+        if drop > 0:
+            block = block[rng.random(len(block)) >= drop]
+        if period:
+            due = start + (k + 1) * period + (abs(rng.normal(0.0, jitter)) if jitter else 0.0)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        if len(block):
+            yield block
+
+
+def encode(block):
+    return np.ascontiguousarray(block, dtype=SAMPLE_DTYPE).tobytes()
+
+
+def decode_stream(read, frame_bytes=CHUNK_SAMPLES * 2 * SAMPLE_DTYPE.itemsize):
+    """Turn a byte reader (read(n) -> bytes, b'' at EOF) back into (n, 2) float chunks."""
+    pair = 2 * SAMPLE_DTYPE.itemsize
+    pending = b''
+    while True:
+        data = read(frame_bytes)
+        if not data:
+            return
+        pending += data
+        usable = len(pending) - len(pending) % pair
+        if usable:
+            yield np.frombuffer(pending[:usable], dtype=SAMPLE_DTYPE).reshape(-1, 2).astype(float)
+            pending = pending[usable:]
+
+
+def pipe_stream(chunks):
+    """Send chunks through an OS pipe from a writer thread and yield what the reading end receives."""
+    read_fd, write_fd = os.pipe()
+
+    def writer():
+        with os.fdopen(write_fd, 'wb', buffering=0) as out:
+            for block in chunks:
+                out.write(encode(block))
+
+    threading.Thread(target=writer, daemon=True).start()
+    with os.fdopen(read_fd, 'rb', buffering=0) as src:
+        yield from decode_stream(src.read)
+
+
+def socket_stream(chunks, host='127.0.0.1'):
+    """Serve chunks from a one-shot local TCP device and yield what a connected client receives."""
+    server = socket.create_server((host, 0))
+    port = server.getsockname()[1]
+
+    def serve():
+        conn, _ = server.accept()
+        with conn:
+            for block in chunks:
+                conn.sendall(encode(block))
+        server.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    with socket.create_connection((host, port)) as client:
+        yield from decode_stream(client.recv)
+
+
+TRANSPORTS = {
+    'inprocess': lambda chunks: chunks,
+    'pipe': pipe_stream,
+    'socket': socket_stream
+}
+
+
+def run_user(session, transport='inprocess', results=None, user=0, **stream_options):
+    classifier = streaming.StreamingClassifier()
+    for block in TRANSPORTS[transport](sample_stream(session, **stream_options)):
+        classifier.push(block[:, 0], block[:, 1])
+    if results is not None:
+        results[user] = classifier
+    return classifier
+
+
+def score_events(events, truth, tolerance=streaming.WINDOW_SIZE // 2):
+    # an event matches a replayed gesture when its window starts within tolerance of the trial start
+    correct = 0
+    for onset, label in truth:
+        matches = [e for e in events if abs(e.start - onset) < tolerance]
+        if matches and matches[0].label == label:
+            correct += 1
+    return correct
+
+
+def run_load(users=1, speed=1.0, transport='inprocess', n_gestures=20, jitter=0.0, drop=0.0, seed=0,
+             root=CLASS_DIR):
+    """Replay a session per simulated user concurrently and report throughput and label latency."""
+    recordings = load_recordings(root)
+    sessions = [build_session(recordings, n_gestures, seed=seed + u) for u in range(users)]
+
+    hd.get_model()  # load once up front so the first gesture does not pay for unpickling
+
+    results = {}
+    threads = [
+        threading.Thread(target=run_user, args=(session, transport, results, u),
+                         kwargs={'speed': speed, 'jitter': jitter, 'drop': drop, 'seed': seed + u})
+        for u, (session, _) in enumerate(sessions)
+    ]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = np.array([lat for c in results.values() for lat in c.latencies])
+    gestures = len(latencies)
+    samples = sum(len(session) for session, _ in sessions)
+    correct = sum(score_events(list(results[u].events), truth) for u, (_, truth) in enumerate(sessions))
+    return {
+        'users': users,
+        'speed': speed,
+        'transport': transport,
+        'jitter': jitter,
+        'drop': drop,
+        'elapsed_s': elapsed,
+        'samples_per_s': samples / elapsed,
+        'gestures': gestures,
+        'gestures_per_s': gestures / elapsed,
+        'replayed_gestures': users * n_gestures,
+        'correct_gestures': correct,
+        'latency_p50_ms': float(np.percentile(latencies, 50) * 1e3) if gestures else None,
+        'latency_p99_ms': float(np.percentile(latencies, 99) * 1e3) if gestures else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay class/ recordings as a simulated EOG device")
+    parser.add_argument('--users', type=int, default=1)
+    parser.add_argument('--speed', type=float, default=1.0, help="rate multiplier, 0 = as fast as possible")
+    parser.add_argument('--transport', choices=sorted(TRANSPORTS), default='inprocess')
+    parser.add_argument('--gestures', type=int, default=20, help="gestures replayed per user")
+    parser.add_argument('--jitter', type=float, default=0.0, help="std of per-packet delay in seconds")
+    parser.add_argument('--drop', type=float, default=0.0, help="probability of dropping each sample")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--root', default=CLASS_DIR)
+    parser.add_argument('--output', help="write the report as JSON to this file")
+    args = parser.parse_args()
+
+    report = run_load(args.users, args.speed, args.transport, args.gestures, args.jitter, args.drop,
+                      args.seed, args.root)
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import time
+from collections import deque, namedtuple
+
+import numpy as np
+from scipy.signal import lfilter, lfilter_zi
+
+import handlingfunctions as hd
+
+# === Streaming Configuration ===
+WINDOW_SIZE = 251  # samples per trial in class/
+PRE_ONSET = 90  # samples kept before the detected onset (class/ gestures start ~70-130 samples in)
+THRESHOLD = 3.0  # onset when energy > baseline mean + THRESHOLD * baseline std
+BASELINE_SECONDS = 2.0  # time constant of the running baseline
+LATENCY_BUDGET = 0.05  # seconds from last window sample to emitted label
+
+GestureEvent = namedtuple('GestureEvent', ['label', 'start', 'end', 'score', 'latency'])
+
+
+class StreamingClassifier:
+    """
+    Incremental H/V classifier: samples are pushed as they arrive at SAMPLE_RATE, a causal band-pass
+    (lfilter with carried zi) feeds an onset detector, and once WINDOW_SIZE samples around an onset are
+    buffered the raw window is classified with the morphological model, like a recorded trial.
+    """
+
+    def __init__(self, on_gesture=None, window_size=WINDOW_SIZE, pre_onset=PRE_ONSET, threshold=THRESHOLD,
+                 refractory=None, baseline_seconds=BASELINE_SECONDS, latency_budget=LATENCY_BUDGET,
+                 model_name='morphological', history=1000):
+        if not 0 <= pre_onset < window_size:
+            raise ValueError("pre_onset must be smaller than window_size")
+        self.on_gesture = on_gesture
+        self.window_size = window_size
+        self.pre_onset = pre_onset
+        self.threshold = threshold
+        self.refractory = window_size // 2 if refractory is None else refractory
+        self.latency_budget = latency_budget
+        self.model_name = model_name
+
+        self._b, self._a = hd.filter_bank.design()
+        self._alpha = 1.0 / (baseline_seconds * hd.SAMPLE_RATE)
+        self._warmup = max(int(baseline_seconds * hd.SAMPLE_RATE), pre_onset)
+
+        # raw samples, two windows deep so a window ending anywhere in the last pushed block is available
+        self._capacity = 2 * window_size
+        self._ring = np.zeros((2, self._capacity))
+        self.latencies = deque(maxlen=history)
+        self.events = deque(maxlen=history)
+        self.reset()
+
+    def reset(self):
+        self._ring[:] = 0.0
+        self._n = 0
+        self._zi = None
+        self._stats_zi = None
+        self._pending_end = None
+        self._blocked_until = self._warmup
+
+    def push(self, h, v):
+        """Feed one or more new samples per channel, returns the gestures completed by them."""
+        received = time.perf_counter()
+        h = np.atleast_1d(np.asarray(h, dtype=float))
+        v = np.atleast_1d(np.asarray(v, dtype=float))
+        if h.shape != v.shape:
+            raise ValueError("Horizontal and vertical chunks must have the same length")
+
+        emitted = []
+        for start in range(0, h.shape[0], self.window_size):
+            block = np.stack([h[start:start + self.window_size], v[start:start + self.window_size]])
+            emitted.extend(self._process(block, received))
+        return emitted
+
+    def _process(self, block, received):
+        n0 = self._n
+        n1 = n0 + block.shape[1]
+
+        # ring buffer write
+        idx = np.arange(n0, n1) % self._capacity
+        self._ring[:, idx] = block
+
+        # causal band-pass, state carried across pushes
+        if self._zi is None:
+            self._zi = lfilter_zi(self._b, self._a)[None, :] * block[:, :1]
+        filtered, self._zi = lfilter(self._b, self._a, block, axis=1, zi=self._zi)
+
+        # running mean of energy and energy^2 as one-pole low-pass filters
+        energy = np.hypot(filtered[0], filtered[1])
+        moments = np.stack([energy, energy * energy])
+        if self._stats_zi is None:
+            self._stats_zi = moments[:, :1] * (1.0 - self._alpha)
+        # baseline seen by each sample is the smoothed value before that sample was included
+        previous = self._stats_zi / (1.0 - self._alpha)
+        smoothed, self._stats_zi = lfilter([self._alpha], [1.0, self._alpha - 1.0], moments, axis=1,
+                                           zi=self._stats_zi)
+        baseline = np.concatenate([previous, smoothed[:, :-1]], axis=1)
+        mean = baseline[0]
+        std = np.sqrt(np.maximum(baseline[1] - mean * mean, 0.0))
+        onsets = np.flatnonzero(energy > mean + self.threshold * std) + n0
+        self._n = n1
+
+        emitted = []
+        while True:
+            if self._pending_end is None:
+                onsets = onsets[onsets >= self._blocked_until]
+                if not onsets.size:
+                    break
+                onset = onsets[0]
+                self._pending_end = onset - self.pre_onset + self.window_size
+                self._blocked_until = self._pending_end + self.refractory
+            if self._pending_end > n1:
+                break
+            emitted.append(self._emit(self._pending_end, received))
+            self._pending_end = None
+
+        return emitted
+
+    def window(self, end):
+        """Raw (2, window_size) window ending at absolute sample index `end`."""
+        if not self._n - self._capacity <= end - self.window_size and end <= self._n:
+            raise ValueError("Window is no longer (or not yet) in the buffer")
+        idx = np.arange(end - self.window_size, end) % self._capacity
+        return self._ring[:, idx]
+
+    def _emit(self, end, received):
+        h_window, v_window = self.window(end)
+        labels, scores = hd.classify_batch(h_window[None, :], v_window[None, :], self.model_name)
+        latency = time.perf_counter() - received
+        event = GestureEvent(labels[0], end - self.window_size, end, float(np.max(scores[0])), latency)
+
+        self.latencies.append(latency)
+        self.events.append(event)
+        if self.on_gesture is not None:
+            self.on_gesture(event)
+        return event
+
+    def latency_report(self):
+        if not self.latencies:
+            return {'gestures': 0}
+        lat = np.array(self.latencies)
+        return {
+            'gestures': len(lat),
+            'p50': float(np.percentile(lat, 50)),
+            'p99': float(np.percentile(lat, 99)),
+            'max': float(lat.max()),
+            'budget': self.latency_budget,
+            'over_budget': int(np.sum(lat > self.latency_budget))
+        }
@@ -0,0 +1,122 @@
+# Lightweight inference backend for the RBF SVC: the joblib model is exported once to a small .npz
+# (support vectors, dual coefficients, intercepts, gamma, classes) and evaluated with plain NumPy, so the
+# hot path needs neither sklearn nor pandas.
+# Usage: python svm_backend.py ["Morphological Feature model.joblib"] [output.npz]
+import os
+import sys
+import threading
+
+import numpy as np
+
+COMPILED_MODEL_PATH = "Morphological Feature model.npz"
+
+
+def export_svm(model, path):
+    """Write the parts of a fitted sklearn RBF SVC needed for prediction to an .npz file."""
+    if getattr(model, 'kernel', None) != 'rbf':
+        raise ValueError("Only RBF-kernel SVC models can be exported")
+    feature_names = getattr(model, 'feature_names_in_', None)
+    np.savez(
+        path,
+        support_vectors=model.support_vectors_,
+        dual_coef=model.dual_coef_,
+        intercept=model.intercept_,
+        n_support=model.n_support_,
+        gamma=np.float64(model._gamma),
+        classes=model.classes_,
+        feature_names=np.array([] if feature_names is None else feature_names, dtype=str),
+        decision_function_shape=np.array(model.decision_function_shape)
+    )
+
+
+def load_compiled(path):
+    with np.load(path, allow_pickle=False) as data:
+        return CompiledSVC(
+            data['support_vectors'], data['dual_coef'], data['intercept'], data['n_support'],
+            float(data['gamma']), data['classes'], list(data['feature_names']),
+            str(data['decision_function_shape'])
+        )
+
+
+class CompiledSVC:
+    """
+    predict / decision_function of a multi-class RBF SVC with libsvm's one-vs-one voting.
+    All pairwise decision values come from one kernel matrix product.
+    """
+
+    def __init__(self, support_vectors, dual_coef, intercept, n_support, gamma, classes, feature_names=None,
+                 decision_function_shape='ovr'):
+        self.support_vectors = np.ascontiguousarray(support_vectors, dtype=float)
+        self.gamma = gamma
+        self.classes_ = np.asarray(classes)
+        self.feature_names = list(feature_names or [])
+        self.decision_function_shape = decision_function_shape
+        self.intercept = np.asarray(intercept, dtype=float)
+        self._sv_sq = np.einsum('ij,ij->i', self.support_vectors, self.support_vectors)
+
+        # weights (n_sv, n_pairs): pair (i, j) uses class i's SVs with their coefficient against j and vice versa
+        n_classes = len(self.classes_)
+        starts = np.concatenate([[0], np.cumsum(n_support)])
+        pairs = [(i, j) for i in range(n_classes) for j in range(i + 1, n_classes)]
+        self.weights = np.zeros((len(self.support_vectors), len(pairs)))
+        for p, (i, j) in enumerate(pairs):
+            self.weights[starts[i]:starts[i + 1], p] = dual_coef[j - 1, starts[i]:starts[i + 1]]
+            self.weights[starts[j]:starts[j + 1], p] = dual_coef[i, starts[j]:starts[j + 1]]
+
+        # incidence matrices turning pairwise results into per-class votes and confidences
+        self._first = np.zeros((len(pairs), n_classes))
+        self._second = np.zeros((len(pairs), n_classes))
+        for p, (i, j) in enumerate(pairs):
+            self._first[p, i] = 1.0
+            self._second[p, j] = 1.0
+        self._local = threading.local()
+
+    def _buffers(self, n):
+        # per-thread kernel buffer, grown on demand and reused for every later call
+        kernel = getattr(self._local, 'kernel', None)
+        if kernel is None or kernel.shape[0] < n:
+            kernel = self._local.kernel = np.empty((max(n, 1), len(self.support_vectors)))
+        return kernel[:n]
+
+    def _pairwise(self, X):
+        X = np.asarray(X, dtype=float)
+        if X.ndim == 1:
+            X = X[None, :]
+        kernel = self._buffers(X.shape[0])
+        # exp(-gamma * ||x - sv||^2) with ||x - sv||^2 = ||x||^2 + ||sv||^2 - 2 x.sv
+        np.dot(X, self.support_vectors.T, out=kernel)
+        kernel *= -2.0
+        kernel += self._sv_sq
+        kernel += np.einsum('ij,ij->i', X, X)[:, None]
+        kernel *= -self.gamma
+        np.exp(kernel, out=kernel)
+        return kernel @ self.weights + self.intercept
+
+    def _votes(self, dec):
+        positive = (dec > 0).astype(float)
+        return positive @ self._first + (1.0 - positive) @ self._second
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self._votes(self._pairwise(X)), axis=1)]
+
+    def decision_function(self, X):
+        dec = self._pairwise(X)
+        if self.decision_function_shape == 'ovo':
+            return dec
+        # same transform as sklearn's ovr decision function: votes plus squashed summed confidences
+        votes = (dec >= 0) @ self._first + (dec < 0) @ self._second
+        confidences = dec @ (self._first - self._second)
+        return votes + confidences / (3 * (np.abs(confidences) + 1))
+
+
+def main():
+    import joblib
+
+    model_path = sys.argv[1] if len(sys.argv) > 1 else "Morphological Feature model.joblib"
+    output = sys.argv[2] if len(sys.argv) > 2 else os.path.splitext(model_path)[0] + '.npz'
+    export_svm(joblib.load(model_path), output)
+    print(f"exported {model_path} -> {output} ({os.path.getsize(output)} bytes)")
+
+
+if __name__ == '__main__':
+    main()
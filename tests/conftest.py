@@ -0,0 +1,6 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the modules live at the repository root, not in a package
+sys.path.insert(0, ROOT)
@@ -0,0 +1,71 @@
+import random
+from fractions import Fraction
+
+import pytest
+
+import calculator_state
+from session_replay import GESTURES
+
+
+def reference(expression):
+    try:
+        return calculator_state.evaluate(expression)
+    except ZeroDivisionError:
+        return None
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_incremental_result_matches_evaluate(seed):
+    rng = random.Random(seed)
+    calc = calculator_state.Calculator()
+    for _ in range(20000):
+        calc.apply(rng.choice(GESTURES))
+        assert calc.result == reference(calc.expression), calc.expression
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_random_key_presses_match_evaluate(seed):
+    # direct presses reach expressions the gesture walk makes rare (long operands, repeated operators)
+    rng = random.Random(seed)
+    keys = calculator_state.DIGITS + calculator_state.OPERATORS + '.'
+    calc = calculator_state.Calculator()
+    for _ in range(20000):
+        calc.press(rng.choice(keys))
+        assert calc.result == reference(calc.expression), calc.expression
+
+
+def press_all(keys):
+    calc = calculator_state.Calculator()
+    for key in keys:
+        calc.press(key)
+    return calc
+
+
+def test_precedence_and_exact_result():
+    calc = press_all('12+3*4-6/4')
+    assert calc.expression == '12+3*4-6/4'
+    assert calc.result == Fraction(45, 2)
+    assert calc.display == '12+3*4-6/4 = 22.5'
+
+
+def test_second_operator_replaces_the_first():
+    calc = press_all('7*-2')
+    assert calc.expression == '7-2'
+    assert calc.result == 5
+
+
+def test_division_by_zero_is_reported_and_cleared():
+    calc = press_all('7/0+')
+    assert calc.error == "Division by zero"
+    assert calc.expression == '7/0'
+    calc.press('2')
+    assert calc.error is None
+    assert calc.result == Fraction(7, 2)
+
+
+def test_blink_presses_selected_key_and_recentres():
+    calc = calculator_state.Calculator()
+    assert calc.apply('left') == ('moved', 'left')
+    assert calc.apply('blink') == ('pressed', '2')
+    assert calc.position == calculator_state.CENTER
+    assert calc.expression == '2'
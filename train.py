@@ -0,0 +1,138 @@
+# Training entry point replacing the GridSearchCV cells of EOG2.ipynb.
+# Feature matrices are cached on disk with joblib.Memory, the grid search runs on all cores and the best
+# model is exported together with a JSON metadata file (feature columns, filter constants, label_map).
+# Usage: python train.py [--features morphological,ar] [--output "Morphological Feature model.joblib"]
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+import dataset
+import handlingfunctions as hd
+
+CACHE_DIR = "train_cache"
+PARAM_GRID = {
+    'C': [0.1, 1, 10, 100],
+    'gamma': ['scale', 'auto', 0.1, 1],
+    'kernel': ['rbf']
+}
+# named column selections for --features, anything else is an extractor or column name of hd.feature_registry
+FEATURE_SETS = {
+    'morphological': hd.SELECTED_COLUMNS,  # the shipped model's columns
+    'morphological-all': ['morphological'],
+    'raw': ['raw'],
+    'ar': ['ar'],
+    'wavelet': ['wavelet']
+}
+
+
+def feature_columns(feature_set, n_samples):
+    """Columns for a comma-separated mix of FEATURE_SETS names, extractor names and column names."""
+    items = []
+    for item in feature_set.split(','):
+        item = item.strip()
+        items.extend(FEATURE_SETS.get(item, [item]))
+    return hd.feature_registry.resolve(items, n_samples)
+
+
+def compute_features(h_signals, v_signals, columns, extractor_keys, filter_params):
+    """
+    Band-pass both channels and compute the columns with hd.feature_registry; wrapped in joblib.Memory by
+    build_features. extractor_keys is not used here, it puts the extractors' versions in the cache key.
+    """
+    low, high, fs, order = filter_params
+    h_filtered = hd.filter_bank.filter(np.asarray(h_signals), low, high, fs, order)
+    v_filtered = hd.filter_bank.filter(np.asarray(v_signals), low, high, fs, order)
+    return hd.feature_registry.select(h_filtered, v_filtered, columns).to_numpy(), list(columns)
+
+
+def build_features(split_dir, feature_set, memory):
+    data = dataset.build_dataset(split_dir)
+    h, v = dataset.trial_signals(data)
+    if isinstance(h, list):
+        raise ValueError(f"Trials in {split_dir} have different lengths, training needs equal-length trials")
+    filter_params = (hd.LOW_CUTOFF, hd.HIGH_CUTOFF, hd.SAMPLE_RATE, hd.ORDER)
+    columns = feature_columns(feature_set, h.shape[1])
+    extractor_keys = hd.feature_registry.cache_keys(columns, h.shape[1])
+    # memmaps are copied so the cache key is the content, not the file the array happens to map
+    X, columns = memory.cache(compute_features)(np.array(h), np.array(v), columns, extractor_keys, filter_params)
+    return X, np.asarray(data.labels), columns
+
+
+def train(train_dir, test_dir=None, feature_set='morphological', output='trained_model.joblib',
+          cache_dir=CACHE_DIR, n_jobs=-1, cv=5, verbose=0):
+    import joblib
+    import pandas as pd
+    from sklearn import __version__ as sklearn_version
+    from sklearn.model_selection import GridSearchCV
+    from sklearn.svm import SVC
+
+    start = time.perf_counter()
+    memory = joblib.Memory(os.path.join(cache_dir, 'features'), verbose=0)
+    X_train, y_train, columns = build_features(train_dir, feature_set, memory)
+    features_time = time.perf_counter() - start
+
+    # DataFrames keep the column names on the model (feature_names_in_), like the shipped model
+    grid_search = GridSearchCV(SVC(), PARAM_GRID, cv=cv, scoring='accuracy', n_jobs=n_jobs, verbose=verbose)
+    grid_search.fit(pd.DataFrame(X_train, columns=columns), y_train)
+    model = grid_search.best_estimator_
+
+    metadata = {
+        'feature_set': feature_set,
+        'feature_columns': columns,
+        'filter': {
+            'sample_rate': hd.SAMPLE_RATE,
+            'low_cutoff': hd.LOW_CUTOFF,
+            'high_cutoff': hd.HIGH_CUTOFF,
+            'order': hd.ORDER
+        },
+        'label_map': {str(k): v for k, v in hd.label_map.items()},
+        'best_params': grid_search.best_params_,
+        'cv_accuracy': float(grid_search.best_score_),
+        'train_dir': os.path.abspath(train_dir),
+        'n_train': int(len(y_train)),
+        'sklearn_version': sklearn_version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+    if test_dir:
+        X_test, y_test, _ = build_features(test_dir, feature_set, memory)
+        metadata['test_dir'] = os.path.abspath(test_dir)
+        metadata['test_accuracy'] = float(model.score(pd.DataFrame(X_test, columns=columns), y_test))
+
+    metadata['features_seconds'] = features_time
+    metadata['total_seconds'] = time.perf_counter() - start
+    joblib.dump(model, output)
+    with open(metadata_path(output), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    return model, metadata
+
+
+def metadata_path(model_path):
+    return os.path.splitext(model_path)[0] + '.json'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grid-search and export an SVM gesture classifier")
+    parser.add_argument('--train', default=os.path.join('class', 'Train'), help="training split directory")
+    parser.add_argument('--test', default=os.path.join('class', 'Test'), help="held-out split, '' to skip")
+    parser.add_argument('--features', default='morphological',
+                        help=f"comma-separated feature sets ({', '.join(FEATURE_SETS)}), extractor or column names")
+    parser.add_argument('--output', default='trained_model.joblib')
+    parser.add_argument('--cache-dir', default=CACHE_DIR)
+    parser.add_argument('--n-jobs', type=int, default=-1, help="grid search workers, -1 = all cores")
+    parser.add_argument('--cv', type=int, default=5)
+    parser.add_argument('--verbose', type=int, default=0)
+    args = parser.parse_args()
+
+    _, metadata = train(args.train, args.test or None, args.features, args.output, args.cache_dir,
+                        args.n_jobs, args.cv, args.verbose)
+    print(f"best params: {metadata['best_params']}  cv accuracy: {metadata['cv_accuracy']:.4f}")
+    if 'test_accuracy' in metadata:
+        print(f"test accuracy: {metadata['test_accuracy']:.4f}")
+    print(f"saved {args.output} and {metadata_path(args.output)} in {metadata['total_seconds']:.2f}s")
+
+
+if __name__ == '__main__':
+    main()